@@ -5,13 +5,15 @@ Sistema Empresarial - Versão de Produção
 Hospedado no Render
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory,
+                   Response, stream_with_context, get_flashed_messages)
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from werkzeug.utils import secure_filename
 import os
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from itertools import chain
 import uuid
 
 # Configurações básicas
@@ -65,10 +67,30 @@ except Exception as e:
         logger.warning(f"⚠️ Erro ao carregar configurações de produção: {e2}")
         logger.info("🔄 Usando configurações padrão")
 
+# Pool de consultas paralelas (usado pelas rotas que leem várias tabelas)
+from parallel_fetch import fetch_parallel, configure_fetch
+from indexed_table import IndexedTable
+from stock_snapshot import (StockSnapshot, get_stock_snapshot, configure_stock_snapshot,
+                            classify_products, STATUS, STATUS_INFO)
+configure_fetch(app.config)
+
+# Limite de tentativas de login por usuário
+from login_throttle import login_throttle, configure_login_throttle
+configure_login_throttle(app.config)
+
 try:
     from models_supabase import Usuario, Cliente, Categoria, Produto, Estoque, Venda, ItemVenda
     from supabase_client import supabase
     from sync_supabase import start_sync, stop_sync, force_sync, get_sync_status
+    from cache_supabase import configure_cache, get_cache_stats
+    from db_backends import configure_backend
+    configure_cache(app.config)
+    configure_backend(app.config)
+    from dashboard_stats import dashboard_stats, configure_dashboard_stats
+    configure_dashboard_stats(app.config)
+    configure_stock_snapshot(app.config)
+    from sales_rollup import sales_rollup, configure_sales_rollup
+    configure_sales_rollup(app.config)
     SUPABASE_AVAILABLE = True
     logger.info("✅ Módulos Supabase carregados com sucesso")
 except Exception as e:
@@ -77,13 +99,76 @@ except Exception as e:
     # Criar classes mock para evitar erros
     class MockModel:
         @staticmethod
-        def get_all():
+        def get_all(*args, **kwargs):
             return []
         @staticmethod
+        def iter_all(*args, **kwargs):
+            return iter([])
+        @staticmethod
         def create(**kwargs):
             return None
         @staticmethod
-        def get_by_id(id):
+        def get_by_id(id, **kwargs):
+            return None
+        @staticmethod
+        def get_by_ids(ids, **kwargs):
+            return {}
+        @staticmethod
+        def bulk_create(rows, **kwargs):
+            return [], []
+        @staticmethod
+        def bulk_upsert(rows, **kwargs):
+            return [], []
+        @staticmethod
+        def indexed():
+            return IndexedTable('mock')
+        @staticmethod
+        def find(**kwargs):
+            return []
+        @staticmethod
+        def find_one(**kwargs):
+            return None
+        @staticmethod
+        def get_by_produto(produto_id):
+            return None
+        @staticmethod
+        def get_by_produtos(produto_ids):
+            return {}
+        @staticmethod
+        def decrement(produto_id, quantidade, **kwargs):
+            return None
+        @staticmethod
+        def commit_sale(venda, itens):
+            return None
+        @staticmethod
+        def get_low_stock(**kwargs):
+            return []
+        @staticmethod
+        def count_low_stock(**kwargs):
+            return 0
+        @staticmethod
+        def get_sales_summary(**kwargs):
+            return []
+        @staticmethod
+        def get_session_user(id):
+            return None
+        @staticmethod
+        def authenticate(username, password):
+            return None
+        @staticmethod
+        def get_sales_by_product(**kwargs):
+            return {}
+        @staticmethod
+        def paginate(page=1, per_page=50, **kwargs):
+            return {'itens': [], 'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
+        @staticmethod
+        def iter_pages(*args, **kwargs):
+            return iter([])
+        @staticmethod
+        def count(**kwargs):
+            return 0
+        @staticmethod
+        def aggregate(func, column, **kwargs):
             return None
         @staticmethod
         def update(id, **kwargs):
@@ -94,31 +179,26 @@ except Exception as e:
     
     Usuario = Cliente = Categoria = Produto = Estoque = Venda = ItemVenda = MockModel()
     supabase = None
-    start_sync = stop_sync = force_sync = get_sync_status = lambda: None
+    start_sync = stop_sync = force_sync = get_sync_status = get_cache_stats = lambda: None
 
 @login_manager.user_loader
 def load_user(user_id):
     """Carrega usuário para o Flask-Login com Supabase integrado"""
     try:
-        logger.info(f"👤 Carregando usuário: {user_id}")
-        
         if SUPABASE_AVAILABLE:
-            # Tentar carregar do Supabase
+            # Tentar carregar do Supabase (cache curto por ID; busca pela chave primária na falta)
             try:
-                usuarios = Usuario.get_all()
-                for usuario in usuarios:
-                    if usuario.get('id') == user_id and usuario.get('ativo', True):
-                        logger.info(f"✅ Usuário {user_id} carregado do Supabase")
-                        
-                        # Criar objeto MockUser para Flask-Login
-                        username = usuario.get('username', 'unknown')
-                        nome = usuario.get('nome', username)
+                usuario = Usuario.get_session_user(user_id)
+                if usuario:
+                    # Criar objeto MockUser para Flask-Login
+                    username = usuario.get('username', 'unknown')
+                    nome = usuario.get('nome', username)
+                    
+                    if username == 'erick':
+                        return MockUser(usuario['id'], username, 'Erick Finger - Admin Máximo')
+                    else:
+                        return MockUser(usuario['id'], username, nome)
                         
-                        if username == 'erick':
-                            return MockUser(usuario['id'], username, 'Erick Finger - Admin Máximo')
-                        else:
-                            return MockUser(usuario['id'], username, nome)
-                            
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao carregar usuário {user_id} do Supabase: {e}")
         
@@ -213,20 +293,16 @@ def authenticate_user(username, password):
         # Primeiro, tentar autenticar via Supabase
         if SUPABASE_AVAILABLE:
             try:
-                # Buscar usuário no Supabase
-                usuarios = Usuario.get_all()
-                for usuario in usuarios:
-                    if (usuario.get('username') == username and 
-                        usuario.get('password') == password and 
-                        usuario.get('ativo', True)):
-                        
-                        logger.info(f"✅ Usuário {username} autenticado via Supabase")
-                        
-                        # Criar objeto MockUser para Flask-Login
-                        if username == 'erick':
-                            return MockUser(usuario['id'], username, 'Erick Finger - Admin Máximo')
-                        else:
-                            return MockUser(usuario['id'], username, usuario.get('nome', username))
+                # Buscar usuário no Supabase (uma consulta pelo username)
+                usuario = Usuario.authenticate(username, password)
+                if usuario:
+                    logger.info(f"✅ Usuário {username} autenticado via Supabase")
+                    
+                    # Criar objeto MockUser para Flask-Login
+                    if username == 'erick':
+                        return MockUser(usuario['id'], username, 'Erick Finger - Admin Máximo')
+                    else:
+                        return MockUser(usuario['id'], username, usuario.get('nome', username))
                 
                 logger.warning(f"❌ Usuário {username} não encontrado ou inativo no Supabase")
                 
@@ -271,6 +347,80 @@ def save_image(file):
         logger.error(f"❌ Erro ao salvar imagem: {e}")
         return None
 
+# Listagens paginadas
+def parametros_listagem(colunas_ordenacao, ordenacao_padrao):
+    """Página, itens por página e ordenação da query string (?page=2&per_page=50&sort=-coluna).
+    
+    Retorna (page, per_page, coluna, desc); colunas fora de `colunas_ordenacao`
+    voltam para a ordenação padrão.
+    """
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', app.config.get('LISTING_PER_PAGE', 50), type=int)),
+                   app.config.get('LISTING_MAX_PER_PAGE', 200))
+    sort = request.args.get('sort') or ordenacao_padrao
+    if sort.lstrip('-') not in colunas_ordenacao:
+        sort = ordenacao_padrao
+    return page, per_page, sort.lstrip('-'), sort.startswith('-')
+
+def filtro_busca(coluna='nome'):
+    """Filtro `coluna__ilike` para o texto de ?q= (vazio se não houver busca)"""
+    q = request.args.get('q', '').strip()
+    return {f'{coluna}__ilike': f'%{q}%'} if q else {}
+
+def listagem_completa():
+    """Indica se a listagem deve trazer todos os registros filtrados (?todos=1, exportação)"""
+    return request.args.get('todos') == '1'
+
+def stream_listing(template_name, **context):
+    """Renderiza o template em streaming (Jinja `generate`), enviando o HTML aos poucos.
+    
+    Iteráveis passados no contexto (ex.: um gerador de páginas do modelo) são
+    consumidos enquanto o corpo é enviado, então nem o resultado nem o HTML
+    completo ficam na memória. O contexto da requisição é mantido até o fim.
+    
+    As mensagens flash são lidas antes de montar a resposta: a sessão é salva
+    quando os cabeçalhos saem, então lê-las durante o envio não as removeria.
+    """
+    context['mensagens'] = get_flashed_messages(with_categories=True)
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(app.config.get('STREAM_BUFFER_SIZE', 20))
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+def stream_json_array(rows):
+    """Resposta JSON (array) gerada em streaming a partir de um iterável de registros.
+    
+    O array é enviado em blocos de STREAM_BUFFER_SIZE registros, sem montar a
+    lista inteira. O primeiro registro é lido antes de responder, então uma
+    falha ao iniciar a leitura ainda cai no tratamento de erro da rota.
+    """
+    rows = iter(rows)
+    primeiro = next(rows, None)
+    tamanho = app.config.get('STREAM_BUFFER_SIZE', 20)
+    
+    def gerar():
+        if primeiro is None:
+            yield '[]'
+            return
+        bloco = ['[', app.json.dumps(primeiro)]
+        for row in rows:
+            bloco.append(',' + app.json.dumps(row))
+            if len(bloco) >= tamanho:
+                yield ''.join(bloco)
+                bloco = []
+        bloco.append(']')
+        yield ''.join(bloco)
+    
+    return Response(stream_with_context(gerar()), mimetype='application/json')
+
+@app.template_global()
+def url_listagem(**params):
+    """URL da listagem atual com parâmetros da query string alterados (None remove o parâmetro)"""
+    args = request.args.to_dict()
+    args.update(params)
+    args = {nome: valor for nome, valor in args.items() if valor not in (None, '')}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
 # Rotas principais
 @app.route('/')
 def index():
@@ -285,81 +435,42 @@ def index():
         
         logger.info("✅ Usuário autenticado, carregando dashboard integrado")
         
-        # Estatísticas integradas com tratamento de erro robusto
-        total_clientes = 0
-        total_produtos = 0
-        total_categorias = 0
-        total_vendas = 0
-        valor_total_vendas = 0.0
-        produtos_sem_estoque = 0
-        produtos_estoque_baixo = 0
-        estoque_total = 0
+        # Estatísticas integradas: contadores mantidos em memória pelas escritas dos modelos.
+        # Sem eles (primeira contagem em segundo plano ainda não terminou), consultas independentes em paralelo
+        # (latência ≈ a da mais lenta); falhas viram 0 em vez de derrubar o dashboard
+        dados = (dashboard_stats.snapshot() if SUPABASE_AVAILABLE else None) or fetch_parallel({
+            'clientes': Cliente.count,
+            'produtos': Produto.count,
+            'categorias': Categoria.count,
+            'vendas': Venda.count,
+            'valor_vendas': lambda: Venda.aggregate('sum', 'total', status='concluida'),
+            # Estoque resumido no banco (view estoque_baixo e agregação), sem percorrer a tabela
+            'sem_estoque': lambda: Estoque.count(quantidade__lte=0),
+            'estoque_baixo': lambda: Estoque.count_low_stock(quantidade__gt=0),
+            'estoque_total': lambda: Estoque.aggregate('sum', 'quantidade')
+        })
         
-        try:
-            if hasattr(Cliente, 'get_all') and callable(Cliente.get_all):
-                clientes_list = Cliente.get_all()
-                total_clientes = len(clientes_list)
-                logger.info(f"✅ Clientes carregados: {total_clientes}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao carregar clientes: {e}")
-            total_clientes = 0
-            
-        try:
-            if hasattr(Produto, 'get_all') and callable(Produto.get_all):
-                produtos_list = Produto.get_all()
-                total_produtos = len(produtos_list)
-                logger.info(f"✅ Produtos carregados: {total_produtos}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao carregar produtos: {e}")
-            total_produtos = 0
-            
-        try:
-            if hasattr(Categoria, 'get_all') and callable(Categoria.get_all):
-                categorias_list = Categoria.get_all()
-                total_categorias = len(categorias_list)
-                logger.info(f"✅ Categorias carregadas: {total_categorias}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao carregar categorias: {e}")
-            total_categorias = 0
-            
-        try:
-            if hasattr(Venda, 'get_all') and callable(Venda.get_all):
-                vendas_list = Venda.get_all()
-                total_vendas = len(vendas_list)
-                
-                # Calcular valor total das vendas
-                for venda in vendas_list:
-                    if venda.get('status') == 'concluida':
-                        valor_total_vendas += float(venda.get('total', 0))
-                
-                logger.info(f"✅ Vendas carregadas: {total_vendas}, Total: R$ {valor_total_vendas:.2f}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao carregar vendas: {e}")
-            total_vendas = 0
-            valor_total_vendas = 0.0
+        # Situação do estoque por produto (mesmos arrays das páginas de produtos e estoque)
+        if SUPABASE_AVAILABLE:
+            try:
+                situacao = get_stock_snapshot().counts()
+                dados['sem_estoque'] = situacao['sem_estoque']
+                dados['estoque_baixo'] = situacao['estoque_baixo']
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao carregar situação do estoque: {e}")
         
-        try:
-            if hasattr(Estoque, 'get_all') and callable(Estoque.get_all):
-                estoque_list = Estoque.get_all()
-                
-                # Calcular estatísticas de estoque
-                for item in estoque_list:
-                    quantidade = item.get('quantidade', 0)
-                    quantidade_minima = item.get('quantidade_minima', 0)
-                    
-                    estoque_total += quantidade
-                    
-                    if quantidade <= 0:
-                        produtos_sem_estoque += 1
-                    elif quantidade <= quantidade_minima:
-                        produtos_estoque_baixo += 1
-                
-                logger.info(f"✅ Estoque analisado: Total {estoque_total}, Sem estoque: {produtos_sem_estoque}, Baixo: {produtos_estoque_baixo}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao carregar estoque: {e}")
-            produtos_sem_estoque = 0
-            produtos_estoque_baixo = 0
-            estoque_total = 0
+        total_clientes = dados['clientes'] or 0
+        total_produtos = dados['produtos'] or 0
+        total_categorias = dados['categorias'] or 0
+        total_vendas = dados['vendas'] or 0
+        valor_total_vendas = dados['valor_vendas'] or 0.0
+        logger.info(f"✅ Contagens: {total_clientes} clientes, {total_produtos} produtos, "
+                    f"{total_categorias} categorias, {total_vendas} vendas (R$ {valor_total_vendas:.2f})")
+        
+        produtos_sem_estoque = dados.get('sem_estoque') or 0
+        produtos_estoque_baixo = dados.get('estoque_baixo') or 0
+        estoque_total = int(dados['estoque_total'] or 0)
+        logger.info(f"✅ Estoque analisado: Total {estoque_total}, Sem estoque: {produtos_sem_estoque}, Baixo: {produtos_estoque_baixo}")
         
         # Retornar HTML com estatísticas integradas
         return f"""
@@ -641,8 +752,15 @@ def login():
         logger.info(f"👤 Tentativa de login para usuário: {username}")
         
         try:
+            if login_throttle.is_blocked(username):
+                espera = login_throttle.retry_after(username)
+                logger.warning(f"⚠️ Login bloqueado para usuário: {username} ({espera}s)")
+                flash(f'Muitas tentativas de login. Tente novamente em {espera} segundos.', 'error')
+                return render_template('login.html'), 429
+            
             user = authenticate_user(username, password)
             if user:
+                login_throttle.reset(username)
                 logger.info(f"✅ Usuário autenticado: {user.username}")
                 login_user(user)
                 logger.info(f"✅ Login bem-sucedido para usuário: {username}")
@@ -650,6 +768,7 @@ def login():
                 flash('Login realizado com sucesso!', 'success')
                 return redirect(url_for('index'))
             else:
+                login_throttle.failure(username)
                 logger.warning(f"❌ Login falhou para usuário: {username}")
                 flash('Usuário ou senha incorretos!', 'error')
         except Exception as e:
@@ -729,12 +848,13 @@ def logout():
 def clientes():
     """Lista de clientes"""
     try:
-        clientes_list = Cliente.get_all()
-        return render_template('clientes.html', clientes=clientes_list)
+        page, per_page, ordem, desc = parametros_listagem(('nome', 'email', 'cidade', 'created_at'), 'nome')
+        pagina = Cliente.paginate(page, per_page, order_by=ordem, desc=desc, **filtro_busca())
+        return render_template('clientes.html', clientes=pagina['itens'], pagina=pagina)
     except Exception as e:
         logger.error(f"Erro ao carregar clientes: {e}")
         flash(f'Erro ao carregar clientes: {e}', 'error')
-        return render_template('clientes.html', clientes=[])
+        return render_template('clientes.html', clientes=[], pagina=None)
 
 @app.route('/cliente/novo', methods=['GET', 'POST'])
 @login_required
@@ -839,12 +959,13 @@ def excluir_cliente(id):
 def categorias():
     """Lista de categorias"""
     try:
-        categorias_list = Categoria.get_all()
-        return render_template('categorias.html', categorias=categorias_list)
+        page, per_page, ordem, desc = parametros_listagem(('nome', 'created_at'), 'nome')
+        pagina = Categoria.paginate(page, per_page, order_by=ordem, desc=desc, **filtro_busca())
+        return render_template('categorias.html', categorias=pagina['itens'], pagina=pagina)
     except Exception as e:
         logger.error(f"Erro ao carregar categorias: {e}")
         flash(f'Erro ao carregar categorias: {e}', 'error')
-        return render_template('categorias.html', categorias=[])
+        return render_template('categorias.html', categorias=[], pagina=None)
 
 @app.route('/categoria/nova', methods=['GET', 'POST'])
 @login_required
@@ -935,82 +1056,73 @@ def produtos():
     try:
         logger.info("📦 Carregando produtos com estoque integrado")
         
-        produtos_list = Produto.get_all()
-        categorias_list = Categoria.get_all()
-        estoque_list = Estoque.get_all()
-        
-        # Criar um dicionário de estoque por produto_id para busca rápida
-        estoque_por_produto = {}
-        for item_estoque in estoque_list:
-            produto_id = item_estoque.get('produto_id')
-            if produto_id:
-                estoque_por_produto[produto_id] = item_estoque
-        
-        # Processar produtos para incluir informações de categoria e estoque
-        produtos_processados = []
-        for produto in produtos_list:
-            # Buscar categoria do produto
-            categoria_obj = None
-            if produto.get('categoria_id'):
-                try:
-                    categoria_obj = Categoria.get_by_id(produto['categoria_id'])
-                except:
-                    categoria_obj = {'nome': 'Sem categoria', 'cor': '#6c757d', 'icone': 'bi-tag'}
-            
-            # Adicionar objeto de categoria ao produto
-            produto['categoria_obj'] = categoria_obj
+        page, per_page, ordem, desc = parametros_listagem(('nome', 'preco', 'created_at'), 'nome')
+        filtros = filtro_busca()
+        if request.args.get('categoria_id'):
+            filtros['categoria_id'] = request.args['categoria_id']
+        
+        todos = listagem_completa()
+        dados = fetch_parallel({
+            'produtos': ((lambda: Produto.count(**filtros)) if todos else
+                         (lambda: Produto.paginate(page, per_page, order_by=ordem, desc=desc, **filtros))),
+            'categorias': Categoria.get_all,
+            'situacao': get_stock_snapshot
+        }, default=[])
+        categorias_list = dados['categorias']
+        situacao = dados['situacao']
+        
+        if todos:
+            # Exportação: todos os produtos filtrados, lidos do banco página a página durante o envio
+            total = dados['produtos'] or 0
+            pagina = {'itens': [], 'page': 1, 'per_page': max(total, 1), 'total': total, 'pages': 1}
+            paginas = Produto.iter_pages(app.config.get('STREAM_PAGE_SIZE', 200), order_by=ordem, desc=desc, **filtros)
+            # Primeira página lida antes de responder: falhas de conexão ainda caem no except abaixo
+            paginas = chain([next(paginas, [])], paginas)
+        else:
+            pagina = dados['produtos'] or None
+            paginas = [pagina['itens']] if pagina else []
+        
+        def processar(produtos_list):
+            """Inclui categoria, estoque e situação em um bloco de produtos"""
+            # Situação do bloco classificada de uma vez (arrays NumPy)
+            produto_ids = [produto.get('id') for produto in produtos_list]
+            # Estoque só dos produtos do bloco, em uma consulta
+            estoque_por_produto = Estoque.get_by_produtos(produto_ids)
+            codigos = (situacao.codes_for(produto_ids) if situacao
+                       else classify_products(produto_ids, estoque_por_produto))
             
-            # Buscar informações de estoque para este produto
-            estoque_info = estoque_por_produto.get(produto.get('id'))
+            # Buscar todas as categorias usadas de uma vez (evita uma consulta por produto)
+            categorias_por_id = Categoria.get_by_ids(
+                produto['categoria_id'] for produto in produtos_list if produto.get('categoria_id')
+            )
             
-            if estoque_info:
-                # Produto tem registro de estoque
+            for produto, codigo in zip(produtos_list, codigos.tolist()):
+                # Adicionar objeto de categoria ao produto
+                produto['categoria_obj'] = categorias_por_id.get(produto.get('categoria_id'))
+                
+                # Informações de estoque (produto sem registro de estoque fica zerado)
+                estoque_info = estoque_por_produto.get(produto.get('id')) or {}
                 produto['quantidade'] = estoque_info.get('quantidade', 0)
                 produto['quantidade_minima'] = estoque_info.get('quantidade_minima', 0)
                 produto['localizacao'] = estoque_info.get('localizacao', '')
                 
-                # Calcular status do estoque
-                quantidade = estoque_info.get('quantidade', 0)
-                quantidade_minima = estoque_info.get('quantidade_minima', 0)
-                
-                if quantidade <= 0:
-                    produto['status_estoque'] = 'sem_estoque'
-                    produto['status_texto'] = 'Sem Estoque'
-                    produto['status_cor'] = 'danger'
-                    produto['status_icone'] = 'bi-x-circle'
-                elif quantidade <= quantidade_minima:
-                    produto['status_estoque'] = 'estoque_baixo'
-                    produto['status_texto'] = 'Estoque Baixo'
-                    produto['status_cor'] = 'warning'
-                    produto['status_icone'] = 'bi-exclamation-triangle'
-                elif quantidade <= quantidade_minima * 2:
-                    produto['status_estoque'] = 'atencao'
-                    produto['status_texto'] = 'Atenção'
-                    produto['status_cor'] = 'info'
-                    produto['status_icone'] = 'bi-info-circle'
-                else:
-                    produto['status_estoque'] = 'ok'
-                    produto['status_texto'] = 'OK'
-                    produto['status_cor'] = 'success'
-                    produto['status_icone'] = 'bi-check-circle'
-            else:
-                # Produto não tem registro de estoque - usar valores padrão
-                produto['quantidade'] = 0
-                produto['quantidade_minima'] = 0
-                produto['localizacao'] = ''
-                produto['status_estoque'] = 'sem_estoque'
-                produto['status_texto'] = 'Sem Estoque'
-                produto['status_cor'] = 'danger'
-                produto['status_icone'] = 'bi-x-circle'
-            
-            produtos_processados.append(produto)
-        
-        logger.info(f"✅ Produtos processados com estoque: {len(produtos_processados)} itens")
-        return render_template('produtos.html', produtos=produtos_processados, categorias=categorias_list)
+                produto['status_estoque'] = STATUS[codigo]
+                produto.update(STATUS_INFO[codigo])
+                yield produto
+        
+        logger.info(f"✅ Produtos com estoque: {pagina['total'] if pagina else 0} encontrados")
+        if todos:
+            produtos_processados = (produto for bloco in paginas for produto in processar(bloco))
+            return stream_listing('produtos.html', produtos=produtos_processados, categorias=categorias_list,
+                                  pagina=pagina)
+        
+        produtos_processados = [produto for bloco in paginas for produto in processar(bloco)]
+        return render_template('produtos.html', produtos=produtos_processados, categorias=categorias_list,
+                               pagina=pagina)
     except Exception as e:
         logger.error(f"❌ Erro ao carregar produtos: {e}")
         flash(f'Erro ao carregar produtos: {e}', 'error')
-        return render_template('produtos.html', produtos=[], categorias=[])
+        return render_template('produtos.html', produtos=[], categorias=[], pagina=None)
 
 @app.route('/produto/novo', methods=['GET', 'POST'])
 @login_required
@@ -1161,15 +1273,7 @@ def editar_produto(id):
                         request.form.get('localizacao')):
                         
                         # Buscar registro de estoque existente
-                        estoque_existente = None
-                        try:
-                            estoque_list = Estoque.get_all()
-                            for item in estoque_list:
-                                if item.get('produto_id') == id:
-                                    estoque_existente = item
-                                    break
-                        except:
-                            pass
+                        estoque_existente = Estoque.get_by_produto(id)
                         
                         if estoque_existente:
                             # Atualizar registro de estoque existente
@@ -1259,50 +1363,48 @@ def estoque():
     try:
         logger.info("📊 Acessando rota de estoque integrada")
         
-        # Buscar produtos e estoque separadamente
+        page, per_page, _, _ = parametros_listagem(('situacao',), 'situacao')
+        status = request.args.get('status')
+        codigo_status = STATUS.index(status) if status in STATUS else None
+        busca = filtro_busca()
+        
+        # Situação do estoque, busca por nome e vendas por produto em paralelo
         try:
-            produtos_list = Produto.get_all()
-            estoque_list = Estoque.get_all()
-            vendas_list = Venda.get_all()
+            dados = fetch_parallel({
+                'situacao': get_stock_snapshot,
+                'busca': lambda: [row['id'] for row in Produto.iter_all(columns=['id'], **busca)] if busca else None,
+                # Quantidade vendida por produto (vendas concluídas), agrupada no banco
+                'vendas': ItemVenda.get_sales_by_product
+            }, default=None)
+            vendas_por_produto = dados['vendas'] or {}
             
-            logger.info(f"✅ Produtos carregados: {len(produtos_list)} itens")
-            logger.info(f"✅ Estoque carregado: {len(estoque_list)} itens")
-            logger.info(f"✅ Vendas carregadas: {len(vendas_list)} itens")
+            situacao = dados['situacao']
+            if situacao is None:
+                # Sem a cópia global: classificar a partir da tabela de estoque inteira
+                situacao = StockSnapshot()
+                situacao.load([row['id'] for row in Produto.iter_all(columns=['id'])], Estoque.indexed().rows())
             
-            # Criar um dicionário de estoque por produto_id para busca rápida
-            estoque_por_produto = {}
-            for item_estoque in estoque_list:
-                produto_id = item_estoque.get('produto_id')
-                if produto_id:
-                    estoque_por_produto[produto_id] = item_estoque
+            # Página em ordem "críticos primeiro" calculada nos arrays; só os produtos da página são lidos
+            ids_pagina, total = situacao.page(page, per_page, status=codigo_status, produto_ids=dados['busca'])
+            produtos_por_id = Produto.get_by_ids(ids_pagina)
+            produtos_list = [produtos_por_id[id] for id in ids_pagina if id in produtos_por_id]
+            codigos = situacao.codes_for([produto['id'] for produto in produtos_list])
+            # Estoque só dos produtos da página
+            estoque_por_produto = Estoque.get_by_produtos(ids_pagina)
+            pagina = {'itens': produtos_list, 'page': page, 'per_page': per_page, 'total': total,
+                      'pages': (total + per_page - 1) // per_page}
             
-            # Calcular estatísticas de vendas por produto
-            vendas_por_produto = {}
-            for venda in vendas_list:
-                if venda.get('status') == 'concluida':
-                    # Buscar itens da venda
-                    try:
-                        itens_venda = ItemVenda.get_all()
-                        for item in itens_venda:
-                            if item.get('venda_id') == venda.get('id'):
-                                produto_id = item.get('produto_id')
-                                quantidade = item.get('quantidade', 0)
-                                if produto_id:
-                                    if produto_id not in vendas_por_produto:
-                                        vendas_por_produto[produto_id] = 0
-                                    vendas_por_produto[produto_id] += quantidade
-                    except:
-                        pass
+            logger.info(f"✅ Produtos carregados: {len(produtos_list)} de {total} itens")
+            logger.info(f"✅ Vendas agregadas: {len(vendas_por_produto)} produtos vendidos")
+            
+            # Buscar as categorias dos produtos da página de uma vez e combinar com estoque
+            categorias_por_id = Categoria.get_by_ids(
+                produto['categoria_id'] for produto in produtos_list if produto.get('categoria_id')
+            )
             
-            # Buscar categorias para cada produto e combinar com estoque
             estoque_items = []
-            for produto in produtos_list:
-                categoria = None
-                if produto.get('categoria_id'):
-                    try:
-                        categoria = Categoria.get_by_id(produto['categoria_id'])
-                    except:
-                        categoria = {'nome': 'Sem categoria', 'cor': '#6c757d', 'icone': 'bi-tag'}
+            for produto, codigo in zip(produtos_list, codigos.tolist()):
+                categoria = categorias_por_id.get(produto.get('categoria_id'))
                 
                 # Buscar informações de estoque para este produto
                 estoque_info = estoque_por_produto.get(produto.get('id'))
@@ -1327,33 +1429,12 @@ def estoque():
                     }
                 
                 # Adicionar informações de vendas
-                vendas_produto = vendas_por_produto.get(produto.get('id'), 0)
+                vendas_produto = (vendas_por_produto.get(produto.get('id')) or {}).get('quantidade', 0)
                 estoque_item['vendas_realizadas'] = vendas_produto
                 
-                # Calcular status do estoque
-                quantidade = estoque_item['quantidade']
-                quantidade_minima = estoque_item['quantidade_minima']
-                
-                if quantidade <= 0:
-                    estoque_item['status'] = 'sem_estoque'
-                    estoque_item['status_texto'] = 'Sem Estoque'
-                    estoque_item['status_cor'] = 'danger'
-                    estoque_item['status_icone'] = 'bi-x-circle'
-                elif quantidade <= quantidade_minima:
-                    estoque_item['status'] = 'estoque_baixo'
-                    estoque_item['status_texto'] = 'Estoque Baixo'
-                    estoque_item['status_cor'] = 'warning'
-                    estoque_item['status_icone'] = 'bi-exclamation-triangle'
-                elif quantidade <= quantidade_minima * 2:
-                    estoque_item['status'] = 'atencao'
-                    estoque_item['status_texto'] = 'Atenção'
-                    estoque_item['status_cor'] = 'info'
-                    estoque_item['status_icone'] = 'bi-info-circle'
-                else:
-                    estoque_item['status'] = 'ok'
-                    estoque_item['status_texto'] = 'OK'
-                    estoque_item['status_cor'] = 'success'
-                    estoque_item['status_icone'] = 'bi-check-circle'
+                # Status do estoque
+                estoque_item['status'] = STATUS[codigo]
+                estoque_item.update(STATUS_INFO[codigo])
                 
                 # Converter string de data para objeto datetime se necessário
                 if isinstance(estoque_item['data_atualizacao'], str):
@@ -1364,31 +1445,19 @@ def estoque():
                 
                 estoque_items.append((produto, estoque_item, categoria or {'nome': 'Sem categoria', 'cor': '#6c757d', 'icone': 'bi-tag'}))
             
-            # Ordenar por status de estoque (críticos primeiro)
-            def ordenar_por_status(item):
-                produto, estoque, categoria = item
-                status_prioridade = {
-                    'sem_estoque': 0,
-                    'estoque_baixo': 1,
-                    'atencao': 2,
-                    'ok': 3
-                }
-                return status_prioridade.get(estoque.get('status', 'ok'), 3)
-            
-            estoque_items.sort(key=ordenar_por_status)
-            
             logger.info(f"📊 Estoque processado com informações integradas: {len(estoque_items)} itens")
             
         except Exception as e:
             logger.warning(f"⚠️ Erro ao carregar produtos/estoque: {e}")
             estoque_items = []
+            pagina = None
         
-        return render_template('estoque.html', estoque_items=estoque_items)
+        return render_template('estoque.html', estoque_items=estoque_items, pagina=pagina)
         
     except Exception as e:
         logger.error(f"❌ Erro crítico na rota de estoque: {e}")
         flash(f'Erro ao carregar estoque: {e}', 'error')
-        return render_template('estoque.html', estoque_items=[])
+        return render_template('estoque.html', estoque_items=[], pagina=None)
 
 @app.route('/estoque/ajustar/<produto_id>', methods=['POST'])
 @login_required
@@ -1417,15 +1486,7 @@ def ajustar_estoque(produto_id):
             return redirect(url_for('estoque'))
         
         # Buscar registro de estoque existente
-        estoque_existente = None
-        try:
-            estoque_list = Estoque.get_all()
-            for item in estoque_list:
-                if item.get('produto_id') == produto_id:
-                    estoque_existente = item
-                    break
-        except:
-            pass
+        estoque_existente = Estoque.get_by_produto(produto_id)
         
         if estoque_existente:
             # Atualizar registro de estoque existente
@@ -1480,15 +1541,7 @@ def venda_rapida(produto_id):
             return redirect(url_for('estoque'))
         
         # Buscar registro de estoque
-        estoque_info = None
-        try:
-            estoque_list = Estoque.get_all()
-            for item in estoque_list:
-                if item.get('produto_id') == produto_id:
-                    estoque_info = item
-                    break
-        except:
-            pass
+        estoque_info = Estoque.get_by_produto(produto_id)
         
         if not estoque_info:
             flash('Produto não possui registro de estoque!', 'error')
@@ -1505,34 +1558,25 @@ def venda_rapida(produto_id):
             flash('Quantidade deve ser maior que zero!', 'error')
             return redirect(url_for('estoque'))
         
-        # Calcular novo estoque
-        novo_estoque = estoque_atual - quantidade
         preco_total = float(produto.get('preco', 0)) * quantidade
         
-        # Atualizar estoque
-        estoque_data = {
-            'quantidade': novo_estoque
-        }
-        
-        if Estoque.update(estoque_info['id'], **estoque_data):
-            # Criar venda
-            venda_data = {
-                'cliente_id': None,  # Venda sem cliente específico
-                'data_venda': datetime.now().isoformat(),
-                'total': preco_total,
-                'status': 'concluida',
-                'tipo': 'venda_rapida'
-            }
-            
-            if Venda.create(**venda_data):
-                flash(f'Venda realizada com sucesso! Total: R$ {preco_total:.2f}', 'success')
-                logger.info(f"✅ Venda rápida realizada para produto {produto_id}, quantidade: {quantidade}")
-            else:
-                flash('Venda realizada, mas erro ao registrar no sistema!', 'warning')
-                logger.warning(f"⚠️ Venda rápida realizada mas erro ao criar registro")
+        # Venda, item e baixa de estoque em uma transação (função registrar_venda): se a venda
+        # não puder ser gravada, o estoque não fica baixado
+        resultado = Venda.commit_sale({
+            'cliente_id': None,  # Venda sem cliente específico
+            'status': 'concluida',
+            'tipo': 'venda_rapida'
+        }, [{'produto_id': produto_id, 'quantidade': quantidade, 'preco_unitario': float(produto.get('preco', 0))}])
+        
+        if resultado and resultado.get('ok'):
+            flash(f'Venda realizada com sucesso! Total: R$ {preco_total:.2f}', 'success')
+            logger.info(f"✅ Venda rápida realizada para produto {produto_id}, quantidade: {quantidade}")
+        elif resultado:
+            flash('Estoque insuficiente: outra venda consumiu o estoque deste produto!', 'error')
+            logger.warning(f"⚠️ Estoque insuficiente na venda rápida do produto {produto_id}")
         else:
-            flash('Erro ao atualizar estoque!', 'error')
-            logger.error(f"❌ Falha ao atualizar estoque para venda rápida")
+            flash('Erro ao registrar a venda!', 'error')
+            logger.error(f"❌ Falha ao registrar venda rápida")
         
         return redirect(url_for('estoque'))
         
@@ -1568,15 +1612,7 @@ def atualizar_estoque_produto(id):
             return redirect(url_for('produtos'))
         
         # Buscar registro de estoque existente
-        estoque_existente = None
-        try:
-            estoque_list = Estoque.get_all()
-            for item in estoque_list:
-                if item.get('produto_id') == id:
-                    estoque_existente = item
-                    break
-        except:
-            pass
+        estoque_existente = Estoque.get_by_produto(id)
         
         if estoque_existente:
             # Atualizar registro de estoque existente
@@ -1621,12 +1657,60 @@ def atualizar_estoque_produto(id):
 def vendas():
     """Lista de vendas"""
     try:
-        vendas_list = Venda.get_all()
-        return render_template('vendas.html', vendas=vendas_list)
+        page, per_page, ordem, desc = parametros_listagem(('data_venda', 'total', 'status'), '-data_venda')
+        filtros = {coluna: request.args[coluna] for coluna in ('status', 'tipo') if request.args.get(coluna)}
+        todos = listagem_completa()
+        if todos:
+            # Exportação: todas as vendas filtradas, lidas do banco página a página durante o envio
+            total = Venda.count(**filtros)
+            pagina = {'itens': [], 'page': 1, 'per_page': max(total, 1), 'total': total, 'pages': 1}
+            paginas = Venda.iter_pages(app.config.get('STREAM_PAGE_SIZE', 200), order_by=ordem, desc=desc, **filtros)
+            # Primeira página lida antes de responder: falhas de conexão ainda caem no except abaixo
+            paginas = chain([next(paginas, [])], paginas)
+        else:
+            pagina = Venda.paginate(page, per_page, order_by=ordem, desc=desc, **filtros)
+            paginas = [pagina['itens']]
+        
+        def processar(vendas_list):
+            """Inclui cliente, itens e produtos em um bloco de vendas"""
+            venda_ids = [venda['id'] for venda in vendas_list]
+            dados = fetch_parallel({
+                'clientes': lambda: Cliente.get_by_ids(venda['cliente_id'] for venda in vendas_list if venda.get('cliente_id')),
+                'itens': lambda: ItemVenda.find(venda_id__in=venda_ids) if venda_ids else []
+            }, default=None)
+            clientes_por_id = dados['clientes'] or {}
+            itens = dados['itens'] or []
+            produtos_por_id = Produto.get_by_ids((item['produto_id'] for item in itens if item.get('produto_id')),
+                                                 columns=['nome'])
+            
+            itens_por_venda = {}
+            for item in itens:
+                item['produto'] = produtos_por_id.get(item.get('produto_id')) or {'nome': 'Produto removido'}
+                itens_por_venda.setdefault(item.get('venda_id'), []).append(item)
+            
+            for venda in vendas_list:
+                venda['cliente'] = clientes_por_id.get(venda.get('cliente_id')) or {'nome': 'Cliente não informado'}
+                venda['itens'] = itens_por_venda.get(venda['id'], [])
+                if isinstance(venda.get('data_venda'), str):
+                    try:
+                        venda['data_venda'] = datetime.fromisoformat(venda['data_venda'].replace('Z', '+00:00'))
+                    except ValueError:
+                        venda['data_venda'] = datetime.now()
+                elif not venda.get('data_venda'):
+                    venda['data_venda'] = datetime.now()
+                yield venda
+        
+        if todos:
+            # Clientes, itens e produtos buscados bloco a bloco, à medida que o HTML é enviado
+            vendas_list = (venda for bloco in paginas for venda in processar(bloco))
+            return stream_listing('vendas.html', vendas=vendas_list, pagina=pagina)
+        
+        vendas_list = [venda for bloco in paginas for venda in processar(bloco)]
+        return render_template('vendas.html', vendas=vendas_list, pagina=pagina)
     except Exception as e:
         logger.error(f"Erro ao carregar vendas: {e}")
         flash(f'Erro ao carregar vendas: {e}', 'error')
-        return render_template('vendas.html', vendas=[])
+        return render_template('vendas.html', vendas=[], pagina=None)
 
 @app.route('/venda/nova', methods=['GET', 'POST'])
 @login_required
@@ -1646,102 +1730,44 @@ def nova_venda():
                 flash('Selecione pelo menos um produto!', 'error')
                 return redirect(url_for('nova_venda'))
             
-            # Validar estoque antes de criar a venda
-            estoque_insuficiente = []
-            total_venda = 0.0
-            
+            # Montar o carrinho
+            itens_venda = []
             for i, produto_id in enumerate(produtos_vendidos):
                 quantidade = int(quantidades[i])
                 preco_unitario = float(precos_unitarios[i])
-                
-                # Verificar estoque disponível
-                estoque_info = None
-                try:
-                    estoque_list = Estoque.get_all()
-                    for item in estoque_list:
-                        if item.get('produto_id') == produto_id:
-                            estoque_info = item
-                            break
-                except:
-                    pass
-                
-                if not estoque_info or estoque_info.get('quantidade', 0) < quantidade:
-                    produto = Produto.get_by_id(produto_id)
-                    nome_produto = produto.get('nome', 'Produto desconhecido') if produto else 'Produto desconhecido'
-                    estoque_disponivel = estoque_info.get('quantidade', 0) if estoque_info else 0
-                    estoque_insuficiente.append({
-                        'nome': nome_produto,
-                        'solicitado': quantidade,
-                        'disponivel': estoque_disponivel
-                    })
-                
-                total_venda += quantidade * preco_unitario
+                itens_venda.append({
+                    'produto_id': produto_id,
+                    'quantidade': quantidade,
+                    'preco_unitario': preco_unitario,
+                    'subtotal': quantidade * preco_unitario
+                })
+            total_venda = sum(item['subtotal'] for item in itens_venda)
             
-            # Se há estoque insuficiente, mostrar erro
-            if estoque_insuficiente:
-                mensagem_erro = "Estoque insuficiente para os seguintes produtos:\n"
-                for item in estoque_insuficiente:
-                    mensagem_erro += f"• {item['nome']}: Solicitado {item['solicitado']}, Disponível {item['disponivel']}\n"
-                flash(mensagem_erro, 'error')
-                return redirect(url_for('nova_venda'))
-            
-            # Criar a venda principal
             venda_data = {
                 'cliente_id': cliente_id if cliente_id != 'none' else None,
-                'data_venda': datetime.now().isoformat(),
                 'total': total_venda,
                 'status': 'concluida',
                 'tipo': 'venda_normal'
             }
             
-            venda_criada = Venda.create(**venda_data)
-            if venda_criada:
-                logger.info(f"✅ Venda criada com ID: {venda_criada['id']}")
-                
-                # Atualizar estoque e criar itens de venda
-                estoque_atualizado = True
-                for i, produto_id in enumerate(produtos_vendidos):
-                    quantidade = int(quantidades[i])
-                    preco_unitario = float(precos_unitarios[i])
-                    
-                    # Buscar estoque do produto
-                    estoque_info = None
-                    for item in estoque_list:
-                        if item.get('produto_id') == produto_id:
-                            estoque_info = item
-                            break
-                    
-                    if estoque_info:
-                        # Atualizar estoque
-                        nova_quantidade = estoque_info.get('quantidade', 0) - quantidade
-                        estoque_data = {'quantidade': nova_quantidade}
-                        
-                        if Estoque.update(estoque_info['id'], **estoque_data):
-                            logger.info(f"✅ Estoque do produto {produto_id} atualizado: {estoque_info.get('quantidade', 0)} → {nova_quantidade}")
-                        else:
-                            logger.warning(f"⚠️ Falha ao atualizar estoque do produto {produto_id}")
-                            estoque_atualizado = False
-                        
-                        # Criar item de venda
-                        item_venda_data = {
-                            'venda_id': venda_criada['id'],
-                            'produto_id': produto_id,
-                            'quantidade': quantidade,
-                            'preco_unitario': preco_unitario,
-                            'subtotal': quantidade * preco_unitario
-                        }
-                        
-                        if ItemVenda.create(**item_venda_data):
-                            logger.info(f"✅ Item de venda criado para produto {produto_id}")
-                        else:
-                            logger.warning(f"⚠️ Falha ao criar item de venda para produto {produto_id}")
-                
-                if estoque_atualizado:
-                    flash(f'Venda criada com sucesso! Total: R$ {total_venda:.2f}. Estoque atualizado automaticamente.', 'success')
-                else:
-                    flash(f'Venda criada com sucesso! Total: R$ {total_venda:.2f}. Mas houve problemas ao atualizar o estoque.', 'warning')
-                
+            # Validação de estoque, venda, itens e baixa de estoque em uma única transação
+            resultado = Venda.commit_sale(venda_data, itens_venda)
+            
+            if resultado and resultado.get('ok'):
+                logger.info(f"✅ Venda criada com ID: {resultado['venda']['id']}")
+                flash(f'Venda criada com sucesso! Total: R$ {total_venda:.2f}. Estoque atualizado automaticamente.', 'success')
                 return redirect(url_for('vendas'))
+            elif resultado:
+                # Se há estoque insuficiente, mostrar erro
+                nomes = Produto.get_by_ids(
+                    [item['produto_id'] for item in resultado['insuficientes']], columns=['nome']
+                )
+                mensagem_erro = "Estoque insuficiente para os seguintes produtos:\n"
+                for item in resultado['insuficientes']:
+                    nome_produto = (nomes.get(item['produto_id']) or {}).get('nome', 'Produto desconhecido')
+                    mensagem_erro += f"• {nome_produto}: Solicitado {item['solicitado']}, Disponível {item['disponivel']}\n"
+                flash(mensagem_erro, 'error')
+                return redirect(url_for('nova_venda'))
             else:
                 flash('Erro ao criar venda!', 'error')
                 
@@ -1750,16 +1776,15 @@ def nova_venda():
             flash(f'Erro ao criar venda: {e}', 'error')
     
     try:
-        clientes_list = Cliente.get_all()
-        produtos_list = Produto.get_all()
+        dados = fetch_parallel({
+            'clientes': lambda: Cliente.get_all(columns=['id', 'nome', 'email']),
+            'produtos': lambda: Produto.get_all(columns=['id', 'nome', 'preco'])
+        }, default=None)
+        clientes_list = dados['clientes'] or []
+        produtos_list = dados['produtos'] or []
         
-        # Adicionar informações de estoque aos produtos
-        estoque_list = Estoque.get_all()
-        estoque_por_produto = {}
-        for item in estoque_list:
-            produto_id = item.get('produto_id')
-            if produto_id:
-                estoque_por_produto[produto_id] = item
+        # Adicionar informações de estoque aos produtos (só os produtos listados)
+        estoque_por_produto = Estoque.get_by_produtos(produto.get('id') for produto in produtos_list)
         
         for produto in produtos_list:
             estoque_info = estoque_por_produto.get(produto.get('id'))
@@ -1787,8 +1812,7 @@ def relatorios():
 def api_relatorio_vendas():
     """API para relatório de vendas"""
     try:
-        vendas = Venda.get_all()
-        return jsonify(vendas)
+        return stream_json_array(Venda.iter_all())
     except Exception as e:
         logger.error(f"Erro no relatório de vendas: {e}")
         return jsonify({'erro': str(e)}), 500
@@ -1798,12 +1822,142 @@ def api_relatorio_vendas():
 def api_relatorio_estoque():
     """API para relatório de estoque"""
     try:
-        estoque = Estoque.get_all()
-        return jsonify(estoque)
+        return stream_json_array(Estoque.iter_all())
     except Exception as e:
         logger.error(f"Erro no relatório de estoque: {e}")
         return jsonify({'erro': str(e)}), 500
 
+def intervalo_relatorio():
+    """Intervalo de datas dos relatórios: ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD ou ?dias=30 (até hoje).
+    
+    Dias em UTC, como as datas gravadas por `Venda.commit_sale` e os dias dos agregados.
+    """
+    hoje = datetime.now(timezone.utc).date()
+    try:
+        fim = date.fromisoformat(request.args['fim']) if request.args.get('fim') else hoje
+        if request.args.get('inicio'):
+            return date.fromisoformat(request.args['inicio']), fim
+    except ValueError:
+        fim = hoje
+    dias = min(max(1, request.args.get('dias', 30, type=int)), 3660)
+    return fim - timedelta(days=dias - 1), fim
+
+def agregados_de_vendas():
+    """Agregados diários de vendas prontos para consulta (None enquanto são contados em segundo plano)"""
+    if SUPABASE_AVAILABLE and sales_rollup.is_ready():
+        return sales_rollup
+    return None
+
+def limite_relatorio():
+    return min(max(1, request.args.get('limite', 10, type=int)), 100)
+
+@app.route('/api/relatorio/vendas-periodo')
+@login_required
+def api_relatorio_vendas_periodo():
+    """Total de vendas concluídas por dia no intervalo (agregados diários)"""
+    try:
+        agregados = agregados_de_vendas()
+        if not agregados:
+            return jsonify({'erro': 'Agregados de vendas em preparação'}), 503, {'Retry-After': '2'}
+        inicio, fim = intervalo_relatorio()
+        return jsonify([{
+            'data': dia['dia'].strftime('%d/%m'),
+            'dia': dia['dia'].isoformat(),
+            'valor': dia['valor'],
+            'vendas': dia['vendas']
+        } for dia in agregados.por_dia(inicio, fim)])
+    except Exception as e:
+        logger.error(f"Erro no relatório de vendas por período: {e}")
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/relatorio/vendas-categoria')
+@login_required
+def api_relatorio_vendas_categoria():
+    """Receita e quantidade vendida por categoria no intervalo (agregados diários)"""
+    try:
+        agregados = agregados_de_vendas()
+        if not agregados:
+            return jsonify({'erro': 'Agregados de vendas em preparação'}), 503, {'Retry-After': '2'}
+        por_categoria = agregados.por_categoria(*intervalo_relatorio())
+        categorias_por_id = Categoria.get_by_ids((id for id in por_categoria if id), columns=['nome'])
+        resultado = [{
+            'categoria': (categorias_por_id.get(id) or {}).get('nome') or 'Sem categoria',
+            'valor': totais['valor'],
+            'quantidade': totais['quantidade']
+        } for id, totais in por_categoria.items()]
+        return jsonify(sorted(resultado, key=lambda c: c['valor'], reverse=True))
+    except Exception as e:
+        logger.error(f"Erro no relatório de vendas por categoria: {e}")
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/relatorio/top-produtos')
+@login_required
+def api_relatorio_top_produtos():
+    """Produtos com maior receita no intervalo (agregados diários)"""
+    try:
+        agregados = agregados_de_vendas()
+        if not agregados:
+            return jsonify({'erro': 'Agregados de vendas em preparação'}), 503, {'Retry-After': '2'}
+        por_produto = agregados.por_produto(*intervalo_relatorio())
+        top = sorted(por_produto.items(), key=lambda p: p[1]['receita'], reverse=True)[:limite_relatorio()]
+        produtos_por_id = Produto.get_by_ids((id for id, _ in top if id), columns=['nome'])
+        return jsonify([{
+            'id': id,
+            'nome': (produtos_por_id.get(id) or {}).get('nome') or 'Produto removido',
+            **totais
+        } for id, totais in top])
+    except Exception as e:
+        logger.error(f"Erro no relatório de produtos mais vendidos: {e}")
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/relatorio/top-clientes')
+@login_required
+def api_relatorio_top_clientes():
+    """Clientes com maior valor comprado no intervalo (agregados diários; vendas sem cliente ficam de fora)"""
+    try:
+        agregados = agregados_de_vendas()
+        if not agregados:
+            return jsonify({'erro': 'Agregados de vendas em preparação'}), 503, {'Retry-After': '2'}
+        por_cliente = agregados.por_cliente(*intervalo_relatorio())
+        top = sorted(((id, totais) for id, totais in por_cliente.items() if id),
+                     key=lambda c: c[1]['total'], reverse=True)[:limite_relatorio()]
+        clientes_por_id = Cliente.get_by_ids((id for id, _ in top), columns=['nome'])
+        return jsonify([{
+            'id': id,
+            'nome': (clientes_por_id.get(id) or {}).get('nome') or 'Cliente removido',
+            **totais
+        } for id, totais in top])
+    except Exception as e:
+        logger.error(f"Erro no relatório de melhores clientes: {e}")
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/estoque/baixo')
+@login_required
+def api_estoque_baixo():
+    """API paginada de itens com estoque baixo (quantidade <= quantidade mínima)"""
+    try:
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(max(1, request.args.get('per_page', 50, type=int)), 500)
+        
+        filtros = {}
+        if request.args.get('categoria_id'):
+            filtros['categoria_id'] = request.args['categoria_id']
+        if request.args.get('sem_estoque') in ('1', 'true'):
+            filtros['quantidade__lte'] = 0
+        
+        total = Estoque.count_low_stock(**filtros)
+        itens = Estoque.get_low_stock(limit=per_page, offset=(page - 1) * per_page, **filtros)
+        return jsonify({
+            'itens': itens,
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page
+        })
+    except Exception as e:
+        logger.error(f"Erro ao buscar estoque baixo: {e}")
+        return jsonify({'erro': str(e)}), 500
+
 # Rotas de Sincronização
 @app.route('/sync/start')
 @login_required
@@ -1858,6 +2012,16 @@ def sync_status_route():
         logger.error(f"Erro ao obter status da sincronização: {e}")
         return jsonify({'erro': str(e)}), 500
 
+@app.route('/cache/status')
+@login_required
+def cache_status_route():
+    """Mostra as estatísticas do cache de leitura"""
+    try:
+        return jsonify(get_cache_stats())
+    except Exception as e:
+        logger.error(f"Erro ao obter status do cache: {e}")
+        return jsonify({'erro': str(e)}), 500
+
 # Rotas PWA
 @app.route('/manifest.json')
 def manifest():
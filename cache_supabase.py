@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de leitura (TTL + LRU) para os modelos do Supabase
+"""
+
+from collections import OrderedDict
+import copy
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ReadCache:
+    """Cache em memória compartilhado pelo processo, com expiração por tabela e despejo LRU"""
+
+    def __init__(self, enabled=True, default_timeout=300, max_entries=500, table_timeouts=None):
+        self.enabled = enabled
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self.table_timeouts = dict(table_timeouts or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, enabled=None, default_timeout=None, max_entries=None, table_timeouts=None):
+        """Altera os parâmetros do cache e descarta o conteúdo atual"""
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if default_timeout is not None:
+                self.default_timeout = default_timeout
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if table_timeouts is not None:
+                self.table_timeouts = dict(table_timeouts)
+            self._entries.clear()
+
+    def timeout_for(self, tablename):
+        """Retorna o TTL (em segundos) configurado para a tabela"""
+        return self.table_timeouts.get(tablename, self.default_timeout)
+
+    def get(self, tablename, key):
+        """Retorna (encontrado, valor) para a chave da tabela"""
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get((tablename, key))
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(tablename, key)]
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end((tablename, key))
+            self.hits += 1
+
+        # Cópia para que alterações feitas pelas rotas não contaminem o cache
+        return True, copy.deepcopy(value)
+
+    def set(self, tablename, key, value):
+        """Armazena um valor para a chave da tabela"""
+        if not self.enabled:
+            return
+
+        timeout = self.timeout_for(tablename)
+        if timeout <= 0:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[(tablename, key)] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end((tablename, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tablename):
+        """Remove todas as entradas de uma tabela"""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == tablename]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Retorna os contadores do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'default_timeout': self.default_timeout,
+                'table_timeouts': dict(self.table_timeouts),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+# Instância global
+read_cache = ReadCache()
+
+# Usuários da sessão (load_user roda em toda requisição autenticada)
+session_cache = ReadCache(default_timeout=60, max_entries=1000)
+
+def configure_cache(config):
+    """Configura o cache a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    cache_type = (value('CACHE_TYPE', 'simple') or 'null').lower()
+    read_cache.configure(
+        enabled=cache_type not in ('null', 'nullcache', 'none'),
+        default_timeout=int(value('CACHE_DEFAULT_TIMEOUT', 300)),
+        max_entries=int(value('CACHE_THRESHOLD', 500)),
+        table_timeouts=value('CACHE_TABLE_TIMEOUTS', {})
+    )
+    session_cache.configure(
+        enabled=read_cache.enabled,
+        default_timeout=int(value('SESSION_USER_CACHE_TIMEOUT', 60)),
+        max_entries=int(value('SESSION_USER_CACHE_SIZE', 1000))
+    )
+    logger.info(f"🗄️ Cache de leitura: {'ativo' if read_cache.enabled else 'desativado'} "
+                f"(TTL padrão {read_cache.default_timeout}s, máximo {read_cache.max_entries} entradas)")
+    return read_cache
+
+def get_cache_stats():
+    """Retorna as estatísticas do cache"""
+    return read_cache.get_stats()
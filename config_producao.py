@@ -13,6 +13,22 @@ class Config:
     SUPABASE_URL = os.getenv('SUPABASE_URL', 'https://txylasunasazzcyvchfe.supabase.co')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY', 'sb_secret_-iHi5o-WP76kpTWev7bQYA_49UtmLdL')
     SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY', 'COLE_SUA_CHAVE_SERVICE_ROLE_AQUI')
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', 4))  # Clientes HTTP keep-alive
+    SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', 5))  # segundos
+    SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', 15))  # segundos
+    
+    # Banco de dados (backend 'supabase' usa a API REST; 'postgres' conecta direto via DATABASE_URL;
+    # 'sqlite' usa um banco local em SQLITE_PATH)
+    DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'supabase')
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    DATABASE_POOL_MIN = int(os.getenv('DATABASE_POOL_MIN', 1))
+    DATABASE_POOL_MAX = int(os.getenv('DATABASE_POOL_MAX', 10))
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_locais.db'))
+    DATABASE_OFFLINE_FALLBACK = os.getenv('DATABASE_OFFLINE_FALLBACK', 'false').lower() in ['true', 'on', '1']
+    
+    # Consultas paralelas nas rotas
+    FETCH_MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', 4))
+    FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', 10))  # segundos por consulta
     
     # Configurações de segurança
     SECRET_KEY = os.getenv('SECRET_KEY', 'sua_chave_secreta_muito_segura_aqui_123456789')
@@ -31,8 +47,32 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     
     # Configurações de cache
-    CACHE_TYPE = 'simple'
-    CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 500))
+    CACHE_TABLE_TIMEOUTS = {
+        'categorias': 600,
+        'estoque': 15,
+        'vendas': 15,
+        'itens_venda': 15
+    }
+    # Usuário da sessão (load_user): TTL curto, invalidado quando o usuário é alterado
+    SESSION_USER_CACHE_TIMEOUT = int(os.getenv('SESSION_USER_CACHE_TIMEOUT', 60))
+    # Limite de falhas de login por usuário (0 desativa)
+    LOGIN_MAX_ATTEMPTS = int(os.getenv('LOGIN_MAX_ATTEMPTS', 5))
+    LOGIN_ATTEMPT_WINDOW = int(os.getenv('LOGIN_ATTEMPT_WINDOW', 300))
+    # Recontagem completa dos contadores do dashboard (segundos)
+    DASHBOARD_RECONCILE_INTERVAL = int(os.getenv('DASHBOARD_RECONCILE_INTERVAL', 300))
+    # Recontagem completa dos agregados diários dos relatórios de vendas (segundos)
+    SALES_ROLLUP_RECONCILE_INTERVAL = int(os.getenv('SALES_ROLLUP_RECONCILE_INTERVAL', 600))
+    # Recarga completa da situação do estoque por produto (segundos)
+    STOCK_SNAPSHOT_TIMEOUT = int(os.getenv('STOCK_SNAPSHOT_TIMEOUT', 300))
+    # Listagens paginadas (clientes, produtos, categorias, estoque e vendas)
+    LISTING_PER_PAGE = int(os.getenv('LISTING_PER_PAGE', 50))
+    LISTING_MAX_PER_PAGE = int(os.getenv('LISTING_MAX_PER_PAGE', 200))
+    # Listagens em streaming (?todos=1): registros lidos por consulta e trechos de HTML por envio
+    STREAM_PAGE_SIZE = int(os.getenv('STREAM_PAGE_SIZE', 200))
+    STREAM_BUFFER_SIZE = int(os.getenv('STREAM_BUFFER_SIZE', 20))
 
 # Configuração ativa
 config = Config()
@@ -59,6 +59,18 @@ class Config:
     
     # Configurações de banco de dados
     DATABASE_URL = os.environ.get('DATABASE_URL')
+    DATABASE_BACKEND = os.environ.get('DATABASE_BACKEND', 'supabase')  # 'supabase', 'postgres' ou 'sqlite'
+    DATABASE_POOL_MIN = int(os.environ.get('DATABASE_POOL_MIN', 1))
+    DATABASE_POOL_MAX = int(os.environ.get('DATABASE_POOL_MAX', 10))
+    DATABASE_CONNECT_TIMEOUT = int(os.environ.get('DATABASE_CONNECT_TIMEOUT', 5))
+    DATABASE_STATEMENT_TIMEOUT = float(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 15))  # segundos
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_locais.db'))
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))  # segundos
+    DATABASE_OFFLINE_FALLBACK = os.environ.get('DATABASE_OFFLINE_FALLBACK', 'false').lower() in ['true', 'on', '1']  # SQLite se o Supabase cair
+    
+    # Consultas paralelas nas rotas (dashboard, produtos, estoque, nova venda)
+    FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', 4))
+    FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', 10))  # segundos por consulta
     
     # Configurações de email (se necessário)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -67,9 +79,36 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     
-    # Configurações de cache
-    CACHE_TYPE = 'simple'
-    CACHE_DEFAULT_TIMEOUT = 300
+    # Configurações de cache (leituras dos modelos Supabase)
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')  # 'null' desativa o cache
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', 500))  # Máximo de entradas (LRU)
+    CACHE_TABLE_TIMEOUTS = {
+        'categorias': 600,
+        'usuarios': 120,
+        'clientes': 120,
+        'produtos': 120,
+        'estoque': 15,
+        'vendas': 15,
+        'itens_venda': 15
+    }
+    # Usuário da sessão (load_user): TTL curto, invalidado quando o usuário é alterado
+    SESSION_USER_CACHE_TIMEOUT = int(os.environ.get('SESSION_USER_CACHE_TIMEOUT', 60))
+    # Limite de falhas de login por usuário (0 desativa)
+    LOGIN_MAX_ATTEMPTS = int(os.environ.get('LOGIN_MAX_ATTEMPTS', 5))
+    LOGIN_ATTEMPT_WINDOW = int(os.environ.get('LOGIN_ATTEMPT_WINDOW', 300))
+    # Recontagem completa dos contadores do dashboard (segundos)
+    DASHBOARD_RECONCILE_INTERVAL = int(os.environ.get('DASHBOARD_RECONCILE_INTERVAL', 300))
+    # Recontagem completa dos agregados diários dos relatórios de vendas (segundos)
+    SALES_ROLLUP_RECONCILE_INTERVAL = int(os.environ.get('SALES_ROLLUP_RECONCILE_INTERVAL', 600))
+    # Recarga completa da situação do estoque por produto (segundos)
+    STOCK_SNAPSHOT_TIMEOUT = int(os.environ.get('STOCK_SNAPSHOT_TIMEOUT', 300))
+    # Listagens paginadas (clientes, produtos, categorias, estoque e vendas)
+    LISTING_PER_PAGE = int(os.environ.get('LISTING_PER_PAGE', 50))
+    LISTING_MAX_PER_PAGE = int(os.environ.get('LISTING_MAX_PER_PAGE', 200))
+    # Listagens em streaming (?todos=1): registros lidos por consulta e trechos de HTML por envio
+    STREAM_PAGE_SIZE = int(os.environ.get('STREAM_PAGE_SIZE', 200))
+    STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', 20))
     
     # Configurações de rate limiting
     RATELIMIT_ENABLED = True
@@ -102,6 +141,7 @@ class TestingConfig(Config):
     """Configurações para testes"""
     TESTING = True
     WTF_CSRF_ENABLED = False
+    CACHE_TYPE = 'null'
 
 # Configuração padrão baseada no ambiente
 config = {
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Contadores do dashboard mantidos incrementalmente
+
+`DashboardStats` guarda apenas os totais exibidos no dashboard. Eles são
+contados no banco com consultas de tamanho constante (`count`/`aggregate`, as
+mesmas da consulta direta do dashboard), nunca percorrendo as tabelas.
+
+Registros inseridos pelos modelos somam a sua parte aos totais na hora (ex.: uma
+venda concluída soma 1 venda e o seu total). Atualizações e remoções não trazem
+o valor anterior do registro, então apenas marcam os contadores da tabela, que
+são recontados na próxima leitura. Escritas de outros processos não passam por
+aqui; por isso tudo é recontado periodicamente (`reconcile_interval`) e a
+diferença encontrada é registrada no log.
+"""
+
+import threading
+import time
+import logging
+
+from models_supabase import Cliente, Categoria, Produto, Estoque, Venda, add_write_listener
+from parallel_fetch import fetch_parallel
+
+logger = logging.getLogger(__name__)
+
+# Contadores de cada tabela, com a consulta que os conta no banco
+TABELAS = {
+    'clientes': {'clientes': Cliente.count},
+    'produtos': {'produtos': Produto.count},
+    'categorias': {'categorias': Categoria.count},
+    'vendas': {
+        'vendas': Venda.count,
+        'valor_vendas': lambda: Venda.aggregate('sum', 'total', status='concluida') or 0.0
+    },
+    'estoque': {'estoque_total': lambda: Estoque.aggregate('sum', 'quantidade') or 0}
+}
+
+class DashboardStats:
+    """Totais do dashboard atualizados pelas escritas e recontados no banco"""
+
+    def __init__(self, reconcile_interval=300):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._totais = {contador: 0 for contadores in TABELAS.values() for contador in contadores}
+        self._reconciled_at = None
+        # Tabelas com contadores a recontar (atualizações e remoções)
+        self._desatualizadas = set()
+        # Tabelas em recontagem e as que receberam escritas durante ela
+        self._recontando = None
+        self._escritas = set()
+        self.last_drift = {}
+
+    @staticmethod
+    def _contribuicao(tabela, row):
+        """{contador: valor} que um registro novo soma aos totais"""
+        if tabela == 'vendas':
+            valor = float(row.get('total') or 0) if row.get('status') == 'concluida' else 0.0
+            return {'vendas': 1, 'valor_vendas': valor}
+        if tabela == 'estoque':
+            return {'estoque_total': int(row.get('quantidade') or 0)}
+        return {tabela: 1}
+
+    def on_write(self, tablename, rows, removed, created=False):
+        """Observador das escritas dos modelos (ver models_supabase.add_write_listener)"""
+        if tablename not in TABELAS:
+            return
+        with self._lock:
+            if self._reconciled_at is None and self._recontando is None:
+                return
+            if self._recontando is not None and tablename in self._recontando:
+                # A contagem em andamento pode ou não enxergar esta escrita: recontar depois
+                self._escritas.add(tablename)
+            elif created and not removed:
+                for row in rows:
+                    for contador, valor in self._contribuicao(tablename, row).items():
+                        self._totais[contador] += valor
+            else:
+                self._desatualizadas.add(tablename)
+
+    def reconcile(self, tabelas=None):
+        """Reconta no banco os contadores das tabelas indicadas (todas por padrão)"""
+        completa = tabelas is None
+        tabelas = set(TABELAS if completa else tabelas)
+        with self._lock:
+            if self._recontando is not None:
+                return False
+            self._recontando = tabelas
+            self._escritas = set()
+            self._desatualizadas -= tabelas
+
+        inicio = time.monotonic()
+        consultas = {contador: consulta for tabela in tabelas for contador, consulta in TABELAS[tabela].items()}
+        valores = fetch_parallel(consultas, default=None)
+        falhas = [contador for contador, valor in valores.items() if valor is None]
+
+        with self._lock:
+            self._recontando = None
+            self._desatualizadas |= self._escritas
+            if falhas:
+                self._desatualizadas |= tabelas
+                logger.error(f"❌ Erro ao recontar contadores do dashboard: {', '.join(falhas)}")
+                return False
+
+            primeira = self._reconciled_at is None
+            drift = {contador: round(valor - self._totais[contador], 2) for contador, valor in valores.items()
+                     if round(valor - self._totais[contador], 2)}
+            self._totais.update(valores)
+            if completa:
+                self._reconciled_at = time.monotonic()
+                self.last_drift = {} if primeira else drift
+
+        if completa and self.last_drift:
+            logger.warning(f"⚠️ Contadores do dashboard corrigidos na recontagem: {self.last_drift}")
+        logger.info(f"✅ Contadores do dashboard recontados em {time.monotonic() - inicio:.2f}s "
+                    f"({', '.join(sorted(tabelas))})")
+        return True
+
+    def _recontar_em_segundo_plano(self):
+        threading.Thread(target=self.reconcile, name='dashboard-stats', daemon=True).start()
+
+    def snapshot(self):
+        """Totais atuais; None enquanto a primeira contagem não termina.
+
+        A primeira contagem (e a periódica, passado `reconcile_interval`) roda em
+        segundo plano. Só os contadores de tabelas atualizadas desde a última
+        leitura são recontados na hora.
+        """
+        if self._reconciled_at is None:
+            if self._recontando is None:
+                self._recontar_em_segundo_plano()
+            return None
+        if self._recontando is None:
+            if self.reconcile_interval > 0 and time.monotonic() - self._reconciled_at >= self.reconcile_interval:
+                self._recontar_em_segundo_plano()
+            elif self._desatualizadas:
+                self.reconcile(set(self._desatualizadas))
+
+        with self._lock:
+            totais = dict(self._totais)
+        totais['valor_vendas'] = round(totais['valor_vendas'], 2)
+        return totais
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'totais': dict(self._totais),
+                'desatualizadas': sorted(self._desatualizadas),
+                'reconcile_interval': self.reconcile_interval,
+                'idade': round(time.monotonic() - self._reconciled_at, 1) if self._reconciled_at else None,
+                'recontando': sorted(self._recontando) if self._recontando is not None else None,
+                'ultima_correcao': dict(self.last_drift)
+            }
+
+# Instância global
+dashboard_stats = DashboardStats()
+add_write_listener(dashboard_stats.on_write)
+
+def configure_dashboard_stats(config):
+    """Configura o intervalo de recontagem a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    dashboard_stats.reconcile_interval = int(value('DASHBOARD_RECONCILE_INTERVAL', 300))
+    logger.info(f"📊 Contadores do dashboard: recontagem a cada {dashboard_stats.reconcile_interval}s")
+    return dashboard_stats
@@ -0,0 +1,817 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends de acesso a dados para os modelos do Sistema Empresarial
+
+Todos os backends expõem as mesmas operações (select, count, insert, upsert,
+update, delete, rpc) e recebem filtros já normalizados como tuplas
+(coluna, operador, valor), com operador em eq/neq/gt/gte/lt/lte/in/ilike/is.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from contextlib import contextmanager
+import threading
+import sqlite3
+import json
+import re
+import uuid
+import logging
+
+from supabase_client import get_table, get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+class FunctionNotFound(RuntimeError):
+    """A função chamada por `rpc` não existe no banco (ex.: supabase_funcoes.sql não aplicado).
+    
+    Só este erro autoriza os modelos a refazer a operação por outro caminho: qualquer
+    outro (timeout, erro dentro da função) pode ter ocorrido depois da gravação.
+    """
+
+class PostgrestBackend:
+    """Backend padrão: API REST do Supabase (PostgREST) via supabase-py"""
+
+    name = 'supabase'
+
+    def is_available(self):
+        """Indica se o cliente Supabase está disponível"""
+        return get_supabase_client() is not None
+
+    def _table(self, tablename):
+        table = get_table(tablename)
+        if table is None:
+            raise RuntimeError(f"Tabela {tablename} indisponível")
+        return table
+
+    @staticmethod
+    def _apply_filters(query, filters):
+        """Aplica os filtros a uma consulta do PostgREST"""
+        for column, op, value in filters:
+            if op == 'in':
+                query = query.in_(column, list(value))
+            elif op == 'is':
+                query = query.is_(column, 'null' if value is None else value)
+            else:
+                query = getattr(query, op)(column, value)
+        return query
+
+    def select(self, tablename, columns=None, filters=(), order_by=None, desc=False, limit=None, offset=None):
+        query = self._table(tablename).select(','.join(columns) if columns else '*')
+        query = self._apply_filters(query, filters)
+        if order_by:
+            query = query.order(order_by, desc=desc)
+        if limit is not None and offset:
+            query = query.range(offset, offset + limit)
+        elif limit is not None:
+            query = query.limit(limit)
+        elif offset:
+            query = query.offset(offset)
+        return query.execute().data or []
+
+    def count(self, tablename, filters=()):
+        query = self._apply_filters(self._table(tablename).select('id', count='exact'), filters)
+        return query.limit(1).execute().count or 0
+
+    def insert(self, tablename, rows):
+        return self._table(tablename).insert(rows).execute().data or []
+
+    def upsert(self, tablename, rows, on_conflict='id'):
+        return self._table(tablename).upsert(rows, on_conflict=on_conflict).execute().data or []
+
+    def update(self, tablename, data, filters):
+        query = self._apply_filters(self._table(tablename).update(data), filters)
+        return query.execute().data or []
+
+    def delete(self, tablename, filters):
+        query = self._apply_filters(self._table(tablename).delete(), filters)
+        return query.execute().data or []
+
+    def rpc(self, function, params):
+        from postgrest.exceptions import APIError
+
+        client = get_supabase_client()
+        if client is None:
+            raise RuntimeError("Cliente Supabase não disponível")
+        try:
+            return client.rpc(function, params).execute().data
+        except APIError as e:
+            # PGRST202: função não encontrada no cache de schema (HTTP 404); 42883: undefined_function
+            if str(e.code) in ('PGRST202', '404', '42883'):
+                raise FunctionNotFound(f"Função {function} não encontrada: {e.message}") from e
+            raise
+
+class PostgresBackend:
+    """Backend direto no PostgreSQL com pool de conexões (psycopg2)"""
+
+    name = 'postgres'
+
+    _OPERATORS = {
+        'eq': '=',
+        'neq': '<>',
+        'gt': '>',
+        'gte': '>=',
+        'lt': '<',
+        'lte': '<=',
+        'ilike': 'ILIKE'
+    }
+
+    def __init__(self, dsn, minconn=1, maxconn=10, connect_timeout=5, statement_timeout=None):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.connect_timeout = connect_timeout
+        self.statement_timeout = statement_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return bool(self.dsn)
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    from psycopg2.pool import ThreadedConnectionPool
+
+                    options = {}
+                    if self.statement_timeout:
+                        options['options'] = f'-c statement_timeout={int(self.statement_timeout * 1000)}'
+                    self._pool = ThreadedConnectionPool(
+                        self.minconn,
+                        self.maxconn,
+                        self.dsn,
+                        connect_timeout=self.connect_timeout,
+                        **options
+                    )
+                    logger.info(f"✅ Pool PostgreSQL criado ({self.minconn}-{self.maxconn} conexões)")
+        return self._pool
+
+    @contextmanager
+    def cursor(self):
+        """Empresta uma conexão do pool e abre uma transação (commit/rollback automáticos)"""
+        from psycopg2.extras import RealDictCursor
+
+        pool = self._get_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+    def close(self):
+        """Fecha todas as conexões do pool"""
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+    @staticmethod
+    def _normalize(value):
+        """Converte tipos do psycopg2 para o mesmo formato JSON devolvido pelo PostgREST"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def _rows(self, cur):
+        if cur.description is None:
+            return []
+        return [{k: self._normalize(v) for k, v in row.items()} for row in cur.fetchall()]
+
+    @staticmethod
+    def _adapt(value):
+        from psycopg2.extras import Json
+
+        if isinstance(value, (dict, list)):
+            return Json(value)
+        return value
+
+    def _where(self, filters):
+        from psycopg2 import sql
+
+        conditions = []
+        params = []
+        for column, op, value in filters:
+            column_sql = sql.Identifier(column)
+            if op == 'in':
+                value = tuple(value)
+                if not value:
+                    conditions.append(sql.SQL('FALSE'))
+                    continue
+                # IN com literais sem tipo: o PostgreSQL converte para o tipo da coluna (uuid, int...)
+                conditions.append(sql.SQL('{} IN %s').format(column_sql))
+                params.append(value)
+            elif op == 'is':
+                literal = {None: 'NULL', 'null': 'NULL', True: 'TRUE', False: 'FALSE'}.get(value, 'NULL')
+                conditions.append(sql.SQL('{} IS ' + literal).format(column_sql))
+            elif op in self._OPERATORS:
+                conditions.append(sql.SQL('{} ' + self._OPERATORS[op] + ' %s').format(column_sql))
+                params.append(value)
+            else:
+                raise ValueError(f"Operador de filtro inválido: {op}")
+
+        if not conditions:
+            return sql.SQL(''), params
+        return sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions), params
+
+    @staticmethod
+    def _columns(columns):
+        from psycopg2 import sql
+
+        if not columns:
+            return sql.SQL('*')
+        return sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+
+    def select(self, tablename, columns=None, filters=(), order_by=None, desc=False, limit=None, offset=None):
+        from psycopg2 import sql
+
+        where, params = self._where(filters)
+        query = sql.SQL('SELECT {} FROM {}').format(self._columns(columns), sql.Identifier(tablename)) + where
+        if order_by:
+            query += sql.SQL(' ORDER BY {}' + (' DESC' if desc else '')).format(sql.Identifier(order_by))
+        if limit is not None:
+            query += sql.SQL(' LIMIT %s')
+            params.append(limit)
+        if offset:
+            query += sql.SQL(' OFFSET %s')
+            params.append(offset)
+
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            return self._rows(cur)
+
+    def count(self, tablename, filters=()):
+        from psycopg2 import sql
+
+        where, params = self._where(filters)
+        query = sql.SQL('SELECT count(*) AS total FROM {}').format(sql.Identifier(tablename)) + where
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchone()['total']
+
+    def _insert_query(self, tablename, rows):
+        """Monta um INSERT multi-linhas; colunas ausentes em uma linha usam DEFAULT"""
+        from psycopg2 import sql
+
+        columns = list(dict.fromkeys(c for row in rows for c in row))
+        params = []
+        values = []
+        for row in rows:
+            cells = []
+            for column in columns:
+                if column in row:
+                    cells.append(sql.Placeholder())
+                    params.append(self._adapt(row[column]))
+                else:
+                    cells.append(sql.SQL('DEFAULT'))
+            values.append(sql.SQL('({})').format(sql.SQL(', ').join(cells)))
+
+        query = sql.SQL('INSERT INTO {} ({}) VALUES {}').format(
+            sql.Identifier(tablename),
+            self._columns(columns),
+            sql.SQL(', ').join(values)
+        )
+        return query, columns, params
+
+    def insert(self, tablename, rows):
+        from psycopg2 import sql
+
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return []
+
+        query, _, params = self._insert_query(tablename, rows)
+        with self.cursor() as cur:
+            cur.execute(query + sql.SQL(' RETURNING *'), params)
+            return self._rows(cur)
+
+    def upsert(self, tablename, rows, on_conflict='id'):
+        from psycopg2 import sql
+
+        if not rows:
+            return []
+
+        query, columns, params = self._insert_query(tablename, rows)
+        conflict = [c.strip() for c in on_conflict.split(',')]
+        updates = [c for c in columns if c not in conflict]
+        if updates:
+            action = sql.SQL('DO UPDATE SET {}').format(sql.SQL(', ').join(
+                sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(c)) for c in updates
+            ))
+        else:
+            action = sql.SQL('DO NOTHING')
+        query += sql.SQL(' ON CONFLICT ({}) ').format(self._columns(conflict)) + action + sql.SQL(' RETURNING *')
+
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            return self._rows(cur)
+
+    def update(self, tablename, data, filters):
+        from psycopg2 import sql
+
+        assignments = sql.SQL(', ').join(
+            sql.SQL('{} = %s').format(sql.Identifier(c)) for c in data
+        )
+        where, params = self._where(filters)
+        query = sql.SQL('UPDATE {} SET {}').format(sql.Identifier(tablename), assignments) + where
+        with self.cursor() as cur:
+            cur.execute(query + sql.SQL(' RETURNING *'), [self._adapt(v) for v in data.values()] + params)
+            return self._rows(cur)
+
+    def delete(self, tablename, filters):
+        from psycopg2 import sql
+
+        where, params = self._where(filters)
+        query = sql.SQL('DELETE FROM {}').format(sql.Identifier(tablename)) + where
+        with self.cursor() as cur:
+            cur.execute(query + sql.SQL(' RETURNING *'), params)
+            return self._rows(cur)
+
+    def rpc(self, function, params):
+        """Chama uma função do banco com argumentos nomeados, como o /rpc do PostgREST"""
+        from psycopg2 import sql
+
+        arguments = sql.SQL(', ').join(
+            sql.SQL('{} => %s').format(sql.Identifier(name)) for name in params
+        )
+        from psycopg2 import errors
+
+        query = sql.SQL('SELECT * FROM {}({})').format(sql.Identifier(function), arguments)
+        try:
+            with self.cursor() as cur:
+                cur.execute(query, [self._adapt(v) for v in params.values()])
+                description = cur.description or []
+                rows = self._rows(cur)
+        except errors.UndefinedFunction as e:
+            # A transação já foi desfeita por `cursor`
+            raise FunctionNotFound(f"Função {function} não encontrada: {e}") from e
+
+        # Funções escalares retornam uma única coluna com o nome da função
+        if len(description) == 1 and description[0].name == function:
+            return rows[0][function] if rows else None
+        return rows
+
+class SQLiteBackend:
+    """Backend embarcado em SQLite (modo WAL) para lojas offline, desenvolvimento e testes.
+    
+    Cada tabela guarda o registro completo como JSON na coluna `dados`, no mesmo
+    formato devolvido pelo PostgREST, com o `id` como chave primária. As colunas
+    usadas em filtros e junções têm índices de expressão sobre `json_extract`.
+    """
+
+    name = 'sqlite'
+
+    # Colunas indexadas por tabela (além do id)
+    INDEXES = {
+        'usuarios': ('username', 'ativo', 'updated_at'),
+        'clientes': ('nome', 'ativo', 'updated_at'),
+        'categorias': ('ativo', 'updated_at'),
+        'produtos': ('categoria_id', 'codigo_barras', 'ativo', 'updated_at'),
+        'estoque': ('produto_id', 'updated_at'),
+        'vendas': ('status', 'data_venda', 'cliente_id', 'created_at', 'updated_at'),
+        'itens_venda': ('venda_id', 'produto_id', 'updated_at')
+    }
+
+    # Views equivalentes às de supabase_funcoes.sql (mesmas colunas id/dados das tabelas)
+    VIEWS = {
+        'estoque_baixo': (
+            ('estoque', 'produtos'),
+            """SELECT e.id AS id,
+                      json_object(
+                          'id', e.id,
+                          'produto_id', json_extract(e.dados, '$.produto_id'),
+                          'quantidade', json_extract(e.dados, '$.quantidade'),
+                          'quantidade_minima', json_extract(e.dados, '$.quantidade_minima'),
+                          'localizacao', json_extract(e.dados, '$.localizacao'),
+                          'updated_at', json_extract(e.dados, '$.updated_at'),
+                          'produto_nome', json_extract(p.dados, '$.nome'),
+                          'codigo_barras', json_extract(p.dados, '$.codigo_barras'),
+                          'categoria_id', json_extract(p.dados, '$.categoria_id'),
+                          'deficit', json_extract(e.dados, '$.quantidade_minima') - json_extract(e.dados, '$.quantidade')
+                      ) AS dados
+                 FROM estoque e
+                 JOIN produtos p ON p.id = json_extract(e.dados, '$.produto_id')
+                WHERE json_extract(e.dados, '$.quantidade') <= json_extract(e.dados, '$.quantidade_minima')"""
+        )
+    }
+
+    # Índices parciais (WHERE) por tabela
+    PARTIAL_INDEXES = {
+        'estoque': (
+            ('baixo', "json_extract(dados, '$.quantidade')",
+             "json_extract(dados, '$.quantidade') <= json_extract(dados, '$.quantidade_minima')"),
+        )
+    }
+
+    # Valores padrão das colunas (equivalentes aos DEFAULT do schema no Supabase)
+    DEFAULTS = {
+        'usuarios': {'ativo': True},
+        'clientes': {'ativo': True},
+        'categorias': {'ativo': True},
+        'produtos': {'ativo': True}
+    }
+
+    _OPERATORS = PostgresBackend._OPERATORS
+    _IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    def __init__(self, path, busy_timeout=5):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._tables = set()
+        self._lock = threading.Lock()
+        self._functions = {
+            'agregar_coluna': self._agregar_coluna,
+            'baixar_estoque': self._baixar_estoque,
+            'registrar_venda': self._registrar_venda,
+            'resumo_vendas': self._resumo_vendas,
+            'vendas_por_produto': self._vendas_por_produto
+        }
+
+    def is_available(self):
+        return bool(self.path)
+
+    def _connection(self):
+        """Conexão da thread atual (o sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False, uri=self.path.startswith('file:'))
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Transação de escrita (BEGIN IMMEDIATE evita deadlock entre leitores que viram escritores)"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def close(self):
+        """Fecha as conexões abertas"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+
+    def _identifier(self, name):
+        if not self._IDENTIFIER.match(name or ''):
+            raise ValueError(f"Nome inválido: {name}")
+        return name
+
+    def _table(self, tablename):
+        """Cria a tabela (ou view) e seus índices na primeira utilização"""
+        tablename = self._identifier(tablename)
+        if tablename not in self._tables:
+            if tablename in self.VIEWS:
+                for tabela in self.VIEWS[tablename][0]:
+                    self._table(tabela)
+            conn = self._connection()
+            with self._lock:
+                if tablename in self._tables:
+                    return tablename
+                if tablename in self.VIEWS:
+                    conn.execute(f'CREATE VIEW IF NOT EXISTS "{tablename}" AS {self.VIEWS[tablename][1]}')
+                else:
+                    conn.execute(f'CREATE TABLE IF NOT EXISTS "{tablename}" '
+                                 f'(id TEXT PRIMARY KEY, dados TEXT NOT NULL)')
+                    for column in self.INDEXES.get(tablename, ()):
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{tablename}_{column}" '
+                                     f'ON "{tablename}" ({self._path(column)})')
+                    for nome, expressao, condicao in self.PARTIAL_INDEXES.get(tablename, ()):
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{tablename}_{nome}" '
+                                     f'ON "{tablename}" ({expressao}) WHERE {condicao}')
+                self._tables.add(tablename)
+        return tablename
+
+    def _path(self, column):
+        """Expressão SQL que extrai a coluna do JSON (id é coluna real)"""
+        if column == 'id':
+            return 'id'
+        return f"json_extract(dados, '$.{self._identifier(column)}')"
+
+    @staticmethod
+    def _param(value):
+        """Converte o valor do filtro para o tipo que o json_extract devolve"""
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (Decimal, uuid.UUID)):
+            return float(value) if isinstance(value, Decimal) else str(value)
+        return value
+
+    def _where(self, filters):
+        conditions = []
+        params = []
+        for column, op, value in filters:
+            path = self._path(column)
+            if op == 'in':
+                value = [self._param(v) for v in value]
+                if not value:
+                    conditions.append('0')
+                    continue
+                conditions.append(f"{path} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif op == 'is':
+                literal = {None: 'NULL', 'null': 'NULL', True: '1', False: '0'}.get(value, 'NULL')
+                conditions.append(f'{path} IS {literal}')
+            elif op == 'ilike':
+                # LIKE do SQLite já ignora maiúsculas/minúsculas; '*' é o curinga do PostgREST
+                conditions.append(f'{path} LIKE ?')
+                params.append(str(value).replace('*', '%'))
+            elif op in self._OPERATORS:
+                conditions.append(f'{path} {self._OPERATORS[op]} ?')
+                params.append(self._param(value))
+            else:
+                raise ValueError(f"Operador de filtro inválido: {op}")
+
+        if not conditions:
+            return '', params
+        return ' WHERE ' + ' AND '.join(conditions), params
+
+    @staticmethod
+    def _project(row, columns):
+        # Embeds do PostgREST (ex.: 'produtos(*)') não existem aqui; '*' devolve o registro inteiro
+        if not columns or '*' in columns:
+            return row
+        return {c: row.get(c) for c in columns if '(' not in c}
+
+    def _encode(self, tablename, row):
+        row = {**self.DEFAULTS.get(tablename, {}), **row}
+        row['id'] = str(row.get('id') or uuid.uuid4())
+        return row, json.dumps(row, default=str)
+
+    def select(self, tablename, columns=None, filters=(), order_by=None, desc=False, limit=None, offset=None):
+        tablename = self._table(tablename)
+        where, params = self._where(filters)
+        query = f'SELECT dados FROM "{tablename}"{where}'
+        if order_by:
+            query += f" ORDER BY {self._path(order_by)}{' DESC' if desc else ''}"
+        if limit is not None or offset:
+            query += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if limit is None else limit, offset or 0])
+
+        cursor = self._connection().execute(query, params)
+        return [self._project(json.loads(dados), columns) for (dados,) in cursor]
+
+    def count(self, tablename, filters=()):
+        tablename = self._table(tablename)
+        where, params = self._where(filters)
+        return self._connection().execute(f'SELECT count(*) FROM "{tablename}"{where}', params).fetchone()[0]
+
+    def insert(self, tablename, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        tablename = self._table(tablename)
+        encoded = [self._encode(tablename, row) for row in rows]
+        with self.transaction() as conn:
+            conn.executemany(f'INSERT INTO "{tablename}" (id, dados) VALUES (?, ?)',
+                             [(row['id'], dados) for row, dados in encoded])
+        return [json.loads(dados) for _, dados in encoded]
+
+    def upsert(self, tablename, rows, on_conflict='id'):
+        tablename = self._table(tablename)
+        conflict = [c.strip() for c in on_conflict.split(',')]
+        gravados = []
+        with self.transaction() as conn:
+            for row in rows:
+                filtros = [(c, 'eq', row.get(c)) for c in conflict]
+                where, params = self._where(filtros)
+                existente = conn.execute(f'SELECT dados FROM "{tablename}"{where} LIMIT 1', params).fetchone()
+                if existente:
+                    # Mesclar como o PostgREST: colunas ausentes mantêm o valor atual
+                    atual = json.loads(existente[0])
+                    row = {**atual, **row, 'id': atual['id']}
+                row, dados = self._encode(tablename, row)
+                conn.execute(f'INSERT OR REPLACE INTO "{tablename}" (id, dados) VALUES (?, ?)',
+                             (row['id'], dados))
+                gravados.append(json.loads(dados))
+        return gravados
+
+    def update(self, tablename, data, filters):
+        tablename = self._table(tablename)
+        where, params = self._where(filters)
+        # json(?) preserva o tipo JSON de cada valor (número, booleano, null...)
+        assignments = ', '.join(f"'$.{self._identifier(c)}', json(?)" for c in data)
+        values = [json.dumps(v, default=str) for v in data.values()]
+        id_sql = ', id = ?' if 'id' in data else ''
+        id_params = [str(data['id'])] if 'id' in data else []
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f'UPDATE "{tablename}" SET dados = json_set(dados, {assignments}){id_sql}{where} RETURNING dados',
+                values + id_params + params
+            )
+            return [json.loads(dados) for (dados,) in cursor.fetchall()]
+
+    def delete(self, tablename, filters):
+        tablename = self._table(tablename)
+        where, params = self._where(filters)
+        with self.transaction() as conn:
+            cursor = conn.execute(f'DELETE FROM "{tablename}"{where} RETURNING dados', params)
+            return [json.loads(dados) for (dados,) in cursor.fetchall()]
+
+    def rpc(self, function, params):
+        """Executa o equivalente local das funções de supabase_funcoes.sql"""
+        handler = self._functions.get(function)
+        if handler is None:
+            raise FunctionNotFound(f"Função {function} não disponível no backend SQLite")
+        return handler(**params)
+
+    def _agregar_coluna(self, tabela, funcao, coluna, filtros=()):
+        if funcao not in ('sum', 'min', 'max', 'avg', 'count'):
+            raise ValueError(f"Função de agregação inválida: {funcao}")
+        tabela = self._table(tabela)
+        where, params = self._where([(f['coluna'], f['op'], f['valor']) for f in filtros or []])
+        return self._connection().execute(
+            f'SELECT {funcao}({self._path(coluna)}) FROM "{tabela}"{where}', params
+        ).fetchone()[0]
+
+    def _baixar_estoque(self, produto, qtd):
+        tabela = self._table('estoque')
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f"""UPDATE "{tabela}"
+                       SET dados = json_set(dados, '$.quantidade', json_extract(dados, '$.quantidade') - ?,
+                                            '$.updated_at', ?)
+                     WHERE {self._path('produto_id')} = ? AND {self._path('quantidade')} >= ?
+                 RETURNING dados""",
+                (qtd, datetime.utcnow().isoformat(), str(produto), qtd)
+            )
+            return [json.loads(dados) for (dados,) in cursor.fetchall()]
+
+    def _registrar_venda(self, venda, itens):
+        """Venda completa em uma transação (mesmo contrato de registrar_venda no Supabase)"""
+        agora = datetime.utcnow().isoformat()
+        pedido = {}
+        for item in itens:
+            produto_id = str(item['produto_id'])
+            pedido[produto_id] = pedido.get(produto_id, 0) + int(item['quantidade'])
+
+        estoque, vendas, itens_venda = self._table('estoque'), self._table('vendas'), self._table('itens_venda')
+        # BEGIN IMMEDIATE trava a escrita no banco: validação e gravação são atômicas
+        with self.transaction() as conn:
+            atuais = {}
+            cursor = conn.execute(
+                f"SELECT dados FROM \"{estoque}\" WHERE {self._path('produto_id')} IN ({', '.join('?' * len(pedido))})",
+                list(pedido)
+            )
+            for (dados,) in cursor:
+                row = json.loads(dados)
+                atuais.setdefault(row['produto_id'], row)
+
+            insuficientes = [
+                {'produto_id': produto_id, 'solicitado': quantidade,
+                 'disponivel': (atuais.get(produto_id) or {}).get('quantidade') or 0}
+                for produto_id, quantidade in pedido.items()
+                if ((atuais.get(produto_id) or {}).get('quantidade') or 0) < quantidade
+            ]
+            if insuficientes:
+                return {'ok': False, 'insuficientes': insuficientes}
+
+            venda_row, venda_dados = self._encode(vendas, {'status': 'concluida', 'created_at': agora,
+                                                           'updated_at': agora, **venda})
+            conn.execute(f'INSERT INTO "{vendas}" (id, dados) VALUES (?, ?)', (venda_row['id'], venda_dados))
+
+            itens_gravados = [
+                self._encode(itens_venda, {'created_at': agora, 'updated_at': agora, **item,
+                                           'venda_id': venda_row['id']})
+                for item in itens
+            ]
+            conn.executemany(f'INSERT INTO "{itens_venda}" (id, dados) VALUES (?, ?)',
+                             [(row['id'], dados) for row, dados in itens_gravados])
+
+            atualizados = []
+            for produto_id, quantidade in pedido.items():
+                row = {**atuais[produto_id], 'quantidade': atuais[produto_id]['quantidade'] - quantidade,
+                       'updated_at': agora}
+                conn.execute(f'UPDATE "{estoque}" SET dados = ? WHERE id = ?', (json.dumps(row, default=str), row['id']))
+                atualizados.append(row)
+
+        return {
+            'ok': True,
+            'venda': json.loads(venda_dados),
+            'itens': [json.loads(item_dados) for _, item_dados in itens_gravados],
+            'estoque': atualizados
+        }
+
+    # Início do período no formato de data do SQLite (semana começando na segunda-feira)
+    _PERIODOS = {
+        'day': "date({0})",
+        'week': "date({0}, 'weekday 0', '-6 days')",
+        'month': "date({0}, 'start of month')"
+    }
+
+    def _resumo_vendas(self, inicio, fim=None, agrupamento='day', filtro_status=None, filtro_tipo=None):
+        if agrupamento not in self._PERIODOS:
+            raise ValueError(f"Agrupamento inválido: {agrupamento}")
+        filtros = [('data_venda', 'gte', inicio)]
+        if fim:
+            filtros.append(('data_venda', 'lt', fim))
+        if filtro_status:
+            filtros.append(('status', 'eq', filtro_status))
+        if filtro_tipo:
+            filtros.append(('tipo', 'eq', filtro_tipo))
+
+        tabela = self._table('vendas')
+        where, params = self._where(filtros)
+        periodo = self._PERIODOS[agrupamento].format(self._path('data_venda'))
+        total = self._path('total')
+        cursor = self._connection().execute(
+            f"""SELECT {periodo} AS periodo, count(*), coalesce(sum({total}), 0), coalesce(avg({total}), 0)
+                  FROM "{tabela}"{where}
+                 GROUP BY 1
+                 ORDER BY 1""",
+            params
+        )
+        return [{'periodo': periodo, 'quantidade': quantidade, 'total': soma, 'ticket_medio': media}
+                for periodo, quantidade, soma, media in cursor]
+
+    def _vendas_por_produto(self, filtro_status='concluida', inicio=None, fim=None):
+        filtros = []
+        if filtro_status:
+            filtros.append(('status', 'eq', filtro_status))
+        if inicio:
+            filtros.append(('data_venda', 'gte', inicio))
+        if fim:
+            filtros.append(('data_venda', 'lt', fim))
+
+        vendas, itens = self._table('vendas'), self._table('itens_venda')
+        where, params = self._where(filtros)
+        item = lambda coluna: f"json_extract(i.dados, '$.{coluna}')"
+        cursor = self._connection().execute(
+            f"""SELECT {item('produto_id')}, sum({item('quantidade')}),
+                       coalesce(sum(coalesce({item('subtotal')}, {item('quantidade')} * {item('preco_unitario')})), 0),
+                       count(DISTINCT {item('venda_id')})
+                  FROM "{itens}" i
+                  JOIN (SELECT id FROM "{vendas}"{where}) v ON v.id = {item('venda_id')}
+                 WHERE {item('produto_id')} IS NOT NULL
+                 GROUP BY 1""",
+            params
+        )
+        return [{'produto_id': produto_id, 'quantidade': quantidade, 'total': total, 'vendas': vendas}
+                for produto_id, quantidade, total, vendas in cursor]
+
+# Backend ativo
+_backend = PostgrestBackend()
+
+def get_backend():
+    """Retorna o backend de dados ativo"""
+    return _backend
+
+def configure_backend(config):
+    """Escolhe o backend a partir das configurações da aplicação (dict ou objeto)"""
+    global _backend
+
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    backend = (value('DATABASE_BACKEND', 'supabase') or 'supabase').lower()
+    if backend == 'supabase' and value('DATABASE_OFFLINE_FALLBACK') and not PostgrestBackend().is_available():
+        logger.warning("⚠️ Supabase indisponível; usando banco local SQLite (modo offline)")
+        backend = 'sqlite'
+    
+    if backend == 'sqlite':
+        _backend = SQLiteBackend(
+            value('SQLITE_PATH', 'dados_locais.db'),
+            busy_timeout=float(value('SQLITE_BUSY_TIMEOUT', 5))
+        )
+    elif backend == 'postgres':
+        if not value('DATABASE_URL'):
+            logger.error("❌ DATABASE_BACKEND=postgres exige DATABASE_URL; mantendo Supabase")
+            return _backend
+        _backend = PostgresBackend(
+            value('DATABASE_URL'),
+            minconn=int(value('DATABASE_POOL_MIN', 1)),
+            maxconn=int(value('DATABASE_POOL_MAX', 10)),
+            connect_timeout=int(value('DATABASE_CONNECT_TIMEOUT', 5)),
+            statement_timeout=value('DATABASE_STATEMENT_TIMEOUT')
+        )
+    else:
+        _backend = PostgrestBackend()
+
+    logger.info(f"🗃️ Backend de dados: {_backend.name}")
+    return _backend
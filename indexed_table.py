@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabelas indexadas em memória para os modelos do Sistema Empresarial
+
+Uma `IndexedTable` guarda uma cópia de uma tabela com índices hash em colunas
+escolhidas (ex.: estoque.produto_id, itens_venda.venda_id). Os índices são
+construídos uma vez e depois atualizados incrementalmente pelas escritas dos
+modelos, em vez de cada requisição montar seus próprios dicionários.
+"""
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IndexedTable:
+    """Cópia em memória de uma tabela com índices hash por coluna"""
+
+    def __init__(self, tablename, indexes=(), timeout=300):
+        self.tablename = tablename
+        self.columns = tuple(indexes)
+        self.timeout = timeout
+        self._rows = {}
+        self._indexes = {column: {} for column in self.columns}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def is_fresh(self):
+        """Indica se a cópia foi carregada e ainda está dentro do TTL (TTL <= 0: sem cache, como no ReadCache)"""
+        if self._loaded_at is None or self.timeout <= 0:
+            return False
+        return time.monotonic() - self._loaded_at < self.timeout
+
+    def load(self, rows):
+        """Substitui todo o conteúdo e reconstrói os índices"""
+        with self._lock:
+            self._rows = {}
+            self._indexes = {column: {} for column in self.columns}
+            for row in rows:
+                self._add(row)
+            self._loaded_at = time.monotonic()
+        logger.info(f"✅ Tabela indexada {self.tablename} carregada: {len(self._rows)} registros")
+
+    def invalidate(self):
+        """Descarta a cópia; a próxima leitura recarrega a tabela"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _add(self, row):
+        id = row.get('id')
+        if id is None:
+            return
+        row = dict(row)
+        self._rows[id] = row
+        for column, index in self._indexes.items():
+            index.setdefault(row.get(column), {})[id] = row
+
+    def _discard(self, id):
+        row = self._rows.pop(id, None)
+        if row is None:
+            return
+        for column, index in self._indexes.items():
+            bucket = index.get(row.get(column))
+            if bucket is not None:
+                bucket.pop(id, None)
+                if not bucket:
+                    del index[row.get(column)]
+
+    def upsert(self, *rows):
+        """Insere ou atualiza registros (linhas parciais são mescladas ao registro atual)"""
+        if not self.loaded:
+            return
+        with self._lock:
+            for row in rows:
+                if not row or row.get('id') is None:
+                    continue
+                atual = self._rows.get(row['id'])
+                self._discard(row['id'])
+                self._add({**atual, **row} if atual else row)
+
+    def remove(self, *ids):
+        """Remove registros pelo ID"""
+        if not self.loaded:
+            return
+        with self._lock:
+            for id in ids:
+                self._discard(id)
+
+    def get(self, id):
+        """Registro pelo ID (cópia) ou None"""
+        with self._lock:
+            row = self._rows.get(id)
+            return dict(row) if row is not None else None
+
+    def find(self, column, value):
+        """Registros com `column == value` via índice hash (cópias)"""
+        with self._lock:
+            return [dict(row) for row in self._indexes[column].get(value, {}).values()]
+
+    def first(self, column, value):
+        """Primeiro registro com `column == value` (cópia) ou None"""
+        with self._lock:
+            for row in self._indexes[column].get(value, {}).values():
+                return dict(row)
+            return None
+
+    def rows(self):
+        """Todos os registros (cópias)"""
+        with self._lock:
+            return [dict(row) for row in self._rows.values()]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'tabela': self.tablename,
+                'registros': len(self._rows),
+                'indices': {column: len(index) for column, index in self._indexes.items()},
+                'carregada': self.loaded,
+                'idade': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None
+            }
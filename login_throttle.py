@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limite de tentativas de login por usuário para o Sistema Empresarial
+
+Depois de `max_attempts` falhas dentro de `window` segundos, novas tentativas
+para o mesmo username são recusadas sem consultar o banco até que a falha
+mais antiga saia da janela. Logins bem-sucedidos zeram o contador.
+"""
+
+from collections import deque
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LoginThrottle:
+    """Janela deslizante de falhas de login por username"""
+
+    def __init__(self, max_attempts=5, window=300, max_entries=10000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_entries = max_entries
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def configure(self, max_attempts=None, window=None):
+        """Altera os parâmetros e descarta os contadores atuais"""
+        with self._lock:
+            if max_attempts is not None:
+                self.max_attempts = int(max_attempts)
+            if window is not None:
+                self.window = float(window)
+            self._failures.clear()
+
+    @staticmethod
+    def _key(username):
+        return (username or '').strip().lower()
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def is_blocked(self, username):
+        """Indica se o username excedeu o limite de falhas na janela atual"""
+        if self.max_attempts <= 0:
+            return False
+        with self._lock:
+            failures = self._recent(self._key(username), time.monotonic())
+            return failures is not None and len(failures) >= self.max_attempts
+
+    def retry_after(self, username):
+        """Segundos até a próxima tentativa ser aceita (0 se não bloqueado)"""
+        with self._lock:
+            now = time.monotonic()
+            failures = self._recent(self._key(username), now)
+            if failures is None or len(failures) < self.max_attempts:
+                return 0
+            return max(0, int(failures[0] + self.window - now) + 1)
+
+    def failure(self, username):
+        """Registra uma tentativa com falha"""
+        if self.max_attempts <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            key = self._key(username)
+            failures = self._recent(key, now)
+            if failures is None:
+                if len(self._failures) >= self.max_entries:
+                    self._purge(now)
+                failures = self._failures[key] = deque(maxlen=self.max_attempts)
+            failures.append(now)
+            if len(failures) >= self.max_attempts:
+                logger.warning(f"⚠️ Login de '{username}' bloqueado por {int(self.window)}s "
+                               f"após {len(failures)} falhas")
+
+    def reset(self, username):
+        """Zera as falhas do username (login bem-sucedido)"""
+        with self._lock:
+            self._failures.pop(self._key(username), None)
+
+    def _purge(self, now):
+        for key in list(self._failures):
+            self._recent(key, now)
+
+    def get_stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            return {
+                'max_attempts': self.max_attempts,
+                'window': self.window,
+                'usuarios': len(self._failures),
+                'bloqueados': sum(1 for f in self._failures.values() if len(f) >= self.max_attempts)
+            }
+
+# Instância global
+login_throttle = LoginThrottle()
+
+def configure_login_throttle(config):
+    """Configura o limite de tentativas a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    login_throttle.configure(
+        max_attempts=value('LOGIN_MAX_ATTEMPTS', 5),
+        window=value('LOGIN_ATTEMPT_WINDOW', 300)
+    )
+    logger.info(f"🔐 Login: até {login_throttle.max_attempts} falhas por usuário "
+                f"a cada {int(login_throttle.window)}s")
+    return login_throttle
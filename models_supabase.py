@@ -5,69 +5,586 @@ Modelos para Supabase - Sistema Empresarial
 """
 
 from supabase_client import get_table
-from datetime import datetime
+from cache_supabase import read_cache, session_cache
+from db_backends import get_backend, FunctionNotFound
+from indexed_table import IndexedTable
+from flask import g, has_app_context
+from datetime import date, datetime, timedelta, timezone
+import threading
+import operator
 import uuid
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _identity_map(tablename):
+    """Retorna o mapa de identidade da tabela para a requisição atual.
+    
+    O mapa vive em `flask.g`, portanto é descartado ao final de cada requisição.
+    Fora de um contexto Flask (ex.: thread de sincronização) retorna None e as
+    leituras vão direto ao Supabase.
+    """
+    if not has_app_context():
+        return None
+    # setdefault é atômico: consultas paralelas da mesma requisição compartilham o mapa
+    mapa = g.setdefault('_identity_map', {})
+    return mapa.setdefault(tablename, {'rows': {}, 'queries': {}})
+
+# Tabelas indexadas em memória, compartilhadas pelo processo (ver BaseModel.indexed)
+_indexed_tables = {}
+_indexed_lock = threading.Lock()
+
+_FILTER_OPERATORS = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'in', 'ilike', 'is')
+_AGGREGATE_FUNCTIONS = ('sum', 'min', 'max', 'avg', 'count')
+
+def _parse_filters(filters):
+    """Converte filtros no formato `coluna__operador=valor` em tuplas (coluna, operador, valor)"""
+    parsed = []
+    for key, value in filters.items():
+        column, _, op = key.partition('__')
+        op = op or 'eq'
+        if op not in _FILTER_OPERATORS:
+            raise ValueError(f"Operador de filtro inválido: {op}")
+        parsed.append((column, op, value))
+    return parsed
+
+_COMPARATORS = {
+    'eq': operator.eq,
+    'neq': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le
+}
+
+def _matches(row, filters):
+    """Avalia filtros (coluna, operador, valor) sobre um registro em memória"""
+    for column, op, value in filters:
+        atual = row.get(column)
+        if op == 'in':
+            ok = atual in value
+        elif op == 'is':
+            ok = atual is None if value in (None, 'null') else atual is value
+        elif op == 'ilike':
+            padrao = '.*'.join(re.escape(parte) for parte in str(value).replace('*', '%').split('%'))
+            ok = atual is not None and re.fullmatch(padrao, str(atual), re.IGNORECASE) is not None
+        else:
+            ok = atual is not None and _COMPARATORS[op](atual, value)
+        if not ok:
+            return False
+    return True
+
+# Observadores das escritas feitas pelos modelos: listener(tablename, rows, removed_ids)
+_write_listeners = []
+
+def add_write_listener(listener):
+    """Registra uma função chamada após cada escrita dos modelos (ex.: contadores do dashboard).
+    
+    Assinatura: `listener(tablename, rows, removed, created)`, onde `created` indica
+    que `rows` são registros recém-inseridos (e não atualizações).
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+def _notify_write(tablename, rows=(), removed=(), created=False):
+    for listener in _write_listeners:
+        try:
+            listener(tablename, rows, removed, created)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao notificar escrita em {tablename}: {e}")
+
+def _filters_key(filters):
+    """Chave de cache estável para um conjunto de filtros"""
+    return tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple, set)) else v)
+                        for k, v in filters.items()))
+
+def _columns_key(columns):
+    """Chave de cache estável para uma projeção de colunas"""
+    return tuple(columns) if columns else None
+
+def _project(row, columns):
+    """Aplica a projeção de colunas a um registro já carregado"""
+    if not columns or row is None:
+        return row
+    return {column: row.get(column) for column in columns}
+
 class BaseModel:
     """Classe base para todos os modelos"""
     
+    # Colunas com índice hash na tabela em memória (ver `indexed`)
+    __indexes__ = ()
+    
     @classmethod
     def get_table(cls):
         """Retorna a tabela do Supabase"""
         return get_table(cls.__tablename__)
     
+    @classmethod
+    def _backend(cls):
+        """Retorna o backend de dados ativo (ou None se indisponível)"""
+        backend = get_backend()
+        return backend if backend.is_available() else None
+    
+    @classmethod
+    def _active_filters(cls, active_only):
+        """Filtro de registros ativos, quando o modelo suporta soft delete"""
+        return [('ativo', 'eq', True)] if active_only and hasattr(cls, 'ativo') else []
+    
+    @classmethod
+    def indexed(cls):
+        """Tabela em memória do modelo com índices hash em `__indexes__`.
+        
+        É carregada na primeira utilização (e novamente após o TTL da tabela no
+        cache, para enxergar escritas de outros processos); entre uma carga e
+        outra é mantida em dia pelas escritas feitas pelos próprios modelos.
+        """
+        tabela = _indexed_tables.get(cls.__tablename__)
+        if tabela is None:
+            with _indexed_lock:
+                tabela = _indexed_tables.get(cls.__tablename__)
+                if tabela is None:
+                    tabela = IndexedTable(cls.__tablename__, cls.__indexes__)
+                    _indexed_tables[cls.__tablename__] = tabela
+        
+        # Mesmo TTL do cache de leitura da tabela (0 = sem cache: recarrega a cada uso)
+        tabela.timeout = read_cache.timeout_for(cls.__tablename__) if read_cache.enabled else 0
+        if not tabela.is_fresh() and cls._backend():
+            try:
+                tabela.load(list(cls.iter_all(active_only=False)))
+            except Exception as e:
+                # Mantém a carga anterior (mesmo expirada) em vez de uma leitura parcial
+                logger.warning(f"⚠️ Tabela em memória de {cls.__name__} não recarregada: {e}")
+        return tabela
+    
+    @classmethod
+    def _remember(cls, *rows, created=False):
+        """Registra (ou substitui) registros no mapa de identidade da requisição"""
+        read_cache.invalidate(cls.__tablename__)
+        _notify_write(cls.__tablename__, rows=[row for row in rows if row], created=created)
+        tabela = _indexed_tables.get(cls.__tablename__)
+        if tabela is not None:
+            tabela.upsert(*rows)
+        mapa = _identity_map(cls.__tablename__)
+        if mapa is not None:
+            # Qualquer listagem em memória ficou desatualizada
+            mapa['queries'].clear()
+            for row in rows:
+                if row and row.get('id') is not None:
+                    mapa['rows'][row['id']] = row
+    
+    @classmethod
+    def refresh_local(cls, rows):
+        """Atualiza o estado local (cache de leitura, tabela em memória e observadores de
+        escrita) com registros já gravados no banco, ex.: alterados por outro processo"""
+        rows = [row for row in rows if row]
+        if rows:
+            cls._remember(*rows)
+        return len(rows)
+    
+    @classmethod
+    def _forget(cls, id):
+        """Remove um registro do mapa de identidade da requisição"""
+        read_cache.invalidate(cls.__tablename__)
+        _notify_write(cls.__tablename__, removed=(id,))
+        tabela = _indexed_tables.get(cls.__tablename__)
+        if tabela is not None:
+            tabela.remove(id)
+        mapa = _identity_map(cls.__tablename__)
+        if mapa is not None:
+            mapa['queries'].clear()
+            mapa['rows'].pop(id, None)
+    
     @classmethod
     def create(cls, **data):
         """Cria um novo registro"""
         try:
-            table = cls.get_table()
-            if table:
+            backend = cls._backend()
+            if backend:
                 # Adiciona timestamps se não existirem
                 if 'created_at' not in data:
                     data['created_at'] = datetime.utcnow().isoformat()
                 if 'updated_at' not in data:
                     data['updated_at'] = datetime.utcnow().isoformat()
                 
-                response = table.insert(data).execute()
+                rows = backend.insert(cls.__tablename__, [data])
                 logger.info(f"✅ {cls.__name__} criado com sucesso")
-                return response.data[0] if response.data else None
+                row = rows[0] if rows else None
+                cls._remember(row, created=True)
+                return row
             return None
         except Exception as e:
             logger.error(f"❌ Erro ao criar {cls.__name__}: {e}")
             return None
     
     @classmethod
-    def get_by_id(cls, id):
-        """Busca um registro por ID"""
+    def bulk_create(cls, rows, chunk_size=500):
+        """Cria vários registros em lotes.
+        
+        Retorna (registros_criados, falhas), onde cada falha descreve o lote que
+        não pôde ser gravado: {'lote': índice, 'linhas': quantidade, 'erro': mensagem}.
+        """
+        return cls._bulk_write(rows, chunk_size, 'insert')
+    
+    @classmethod
+    def bulk_upsert(cls, rows, on_conflict='id', chunk_size=500):
+        """Cria ou atualiza vários registros em lotes (INSERT ... ON CONFLICT DO UPDATE).
+        
+        Retorna (registros_gravados, falhas) no mesmo formato de `bulk_create`.
+        """
+        return cls._bulk_write(rows, chunk_size, 'upsert', on_conflict=on_conflict)
+    
+    @classmethod
+    def _bulk_write(cls, rows, chunk_size, operacao, on_conflict='id'):
+        """Grava registros em lotes com uma requisição por lote"""
+        gravados = []
+        falhas = []
+        
+        # Timestamps preenchidos em uma única passada
+        agora = datetime.utcnow().isoformat()
+        rows = [dict(row) for row in rows]
+        for row in rows:
+            row.setdefault('created_at', agora)
+            row.setdefault('updated_at', agora)
+        
+        backend = cls._backend()
+        if not backend:
+            if rows:
+                falhas.append({'lote': 0, 'linhas': len(rows), 'erro': 'Backend de dados indisponível'})
+            return gravados, falhas
+        
+        for indice, inicio in enumerate(range(0, len(rows), chunk_size)):
+            lote = rows[inicio:inicio + chunk_size]
+            try:
+                if operacao == 'upsert':
+                    gravados.extend(backend.upsert(cls.__tablename__, lote, on_conflict=on_conflict))
+                else:
+                    gravados.extend(backend.insert(cls.__tablename__, lote))
+            except Exception as e:
+                logger.error(f"❌ Erro no lote {indice} de {cls.__name__} ({len(lote)} registros): {e}")
+                falhas.append({'lote': indice, 'linhas': len(lote), 'erro': str(e)})
+        
+        if gravados or falhas:
+            cls._remember(*gravados, created=operacao == 'insert')
+        logger.info(f"✅ {len(gravados)} registros de {cls.__name__} gravados em lote ({len(falhas)} lotes com falha)")
+        return gravados, falhas
+    
+    @classmethod
+    def get_by_id(cls, id, columns=None):
+        """Busca um registro por ID (opcionalmente apenas as colunas informadas)"""
         try:
-            table = cls.get_table()
-            if table:
-                response = table.select('*').eq('id', id).execute()
-                return response.data[0] if response.data else None
-            return None
+            mapa = _identity_map(cls.__tablename__)
+            if mapa is not None and id in mapa['rows']:
+                return _project(mapa['rows'][id], columns)
+            
+            key = ('id', id, _columns_key(columns))
+            found, row = read_cache.get(cls.__tablename__, key)
+            if not found:
+                backend = cls._backend()
+                if not backend:
+                    return None
+                rows = backend.select(cls.__tablename__, columns, [('id', 'eq', id)], limit=1)
+                row = rows[0] if rows else None
+                if row:
+                    read_cache.set(cls.__tablename__, key, row)
+            
+            # Só registros completos entram no mapa de identidade
+            if mapa is not None and row and not columns:
+                mapa['rows'][id] = row
+            return row
         except Exception as e:
             logger.error(f"❌ Erro ao buscar {cls.__name__} por ID: {e}")
             return None
     
     @classmethod
-    def get_all(cls, active_only=True):
-        """Busca todos os registros"""
+    def get_by_ids(cls, ids, chunk_size=100, columns=None):
+        """Busca vários registros por ID em lotes (filtro `in`) e retorna um dict {id: registro}"""
         try:
-            table = cls.get_table()
-            if table:
-                query = table.select('*')
-                if active_only and hasattr(cls, 'ativo'):
-                    query = query.eq('ativo', True)
-                response = query.execute()
-                return response.data if response.data else []
-            return []
+            ids = [id for id in dict.fromkeys(ids) if id is not None]
+            result = {}
+            mapa = _identity_map(cls.__tablename__)
+            colunas = _columns_key(columns)
+            
+            # Primeiro o que já está em memória (requisição atual ou cache do processo)
+            pendentes = []
+            for id in ids:
+                if mapa is not None and id in mapa['rows']:
+                    result[id] = _project(mapa['rows'][id], columns)
+                    continue
+                found, row = read_cache.get(cls.__tablename__, ('id', id, colunas))
+                if found:
+                    result[id] = row
+                else:
+                    pendentes.append(id)
+            
+            if pendentes:
+                backend = cls._backend()
+                if backend:
+                    # O ID é necessário para montar o dicionário de resultado
+                    select = columns and ['id'] + [c for c in columns if c != 'id']
+                    for inicio in range(0, len(pendentes), chunk_size):
+                        lote = pendentes[inicio:inicio + chunk_size]
+                        for row in backend.select(cls.__tablename__, select, [('id', 'in', lote)]):
+                            read_cache.set(cls.__tablename__, ('id', row['id'], colunas), row)
+                            if mapa is not None and not columns:
+                                row = mapa['rows'].setdefault(row['id'], row)
+                            result[row['id']] = row
+            return result
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar {cls.__name__} por IDs: {e}")
+            return {}
+    
+    @classmethod
+    def get_all(cls, active_only=True, columns=None):
+        """Busca todos os registros (opcionalmente apenas as colunas informadas)"""
+        try:
+            mapa = _identity_map(cls.__tablename__)
+            key = ('all', active_only, _columns_key(columns))
+            if mapa is not None and key in mapa['queries']:
+                return list(mapa['queries'][key])
+            
+            found, rows = read_cache.get(cls.__tablename__, key)
+            if not found:
+                backend = cls._backend()
+                if not backend:
+                    return []
+                rows = backend.select(cls.__tablename__, columns, cls._active_filters(active_only))
+                read_cache.set(cls.__tablename__, key, rows)
+            
+            if mapa is not None:
+                if not columns:
+                    # Reaproveita objetos já carregados para manter uma única instância por ID
+                    rows = [mapa['rows'].setdefault(row['id'], row) if row.get('id') is not None else row
+                            for row in rows]
+                mapa['queries'][key] = rows
+                return list(rows)
+            return rows
         except Exception as e:
             logger.error(f"❌ Erro ao buscar todos {cls.__name__}: {e}")
             return []
     
+    @classmethod
+    def find(cls, columns=None, order_by=None, desc=False, limit=None, **filters):
+        """Busca registros filtrados no servidor.
+        
+        Filtros no formato `coluna__operador=valor` (eq, neq, gt, gte, lt, lte, in,
+        ilike, is), ex.: `Estoque.find(produto_id=id)` ou
+        `Venda.find(status='concluida', data_venda__gte=inicio, order_by='data_venda')`.
+        """
+        try:
+            mapa = _identity_map(cls.__tablename__)
+            key = ('find', _filters_key(filters), _columns_key(columns), order_by, desc, limit)
+            if mapa is not None and key in mapa['queries']:
+                return list(mapa['queries'][key])
+            
+            found, rows = read_cache.get(cls.__tablename__, key)
+            if not found:
+                backend = cls._backend()
+                if not backend:
+                    return []
+                rows = backend.select(cls.__tablename__, columns, _parse_filters(filters),
+                                      order_by=order_by, desc=desc, limit=limit)
+                read_cache.set(cls.__tablename__, key, rows)
+            
+            if mapa is not None:
+                if not columns:
+                    rows = [mapa['rows'].setdefault(row['id'], row) if row.get('id') is not None else row
+                            for row in rows]
+                mapa['queries'][key] = rows
+                return list(rows)
+            return rows
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar {cls.__name__} com filtros {filters}: {e}")
+            return []
+    
+    @classmethod
+    def find_one(cls, columns=None, order_by=None, desc=False, **filters):
+        """Primeiro registro que atende aos filtros (ou None)"""
+        rows = cls.find(columns=columns, order_by=order_by, desc=desc, limit=1, **filters)
+        return rows[0] if rows else None
+    
+    @classmethod
+    def paginate(cls, page=1, per_page=50, order_by='id', desc=False, columns=None, **filters):
+        """Uma página de registros com o total (filtro, ordenação, limite e deslocamento no banco).
+        
+        Retorna {'itens', 'page', 'per_page', 'total', 'pages'}. Filtros no formato
+        `coluna__operador=valor`; o custo não depende do tamanho da tabela além do
+        que o próprio banco gasta com o índice da ordenação.
+        """
+        page = max(1, int(page))
+        per_page = max(1, int(per_page))
+        vazia = {'itens': [], 'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
+        try:
+            key = ('pagina', page, per_page, order_by, desc, _columns_key(columns), _filters_key(filters))
+            found, pagina = read_cache.get(cls.__tablename__, key)
+            if found:
+                return pagina
+            
+            backend = cls._backend()
+            if not backend:
+                return vazia
+            
+            parsed = _parse_filters(filters)
+            total = backend.count(cls.__tablename__, parsed)
+            inicio = (page - 1) * per_page
+            itens = backend.select(cls.__tablename__, columns, parsed, order_by=order_by, desc=desc,
+                                   limit=per_page, offset=inicio) if inicio < total else []
+            pagina = {
+                'itens': itens,
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
+            }
+            read_cache.set(cls.__tablename__, key, pagina)
+            return pagina
+        except Exception as e:
+            logger.error(f"❌ Erro ao paginar {cls.__name__}: {e}")
+            return vazia
+    
+    @classmethod
+    def iter_all(cls, page_size=1000, order_by='id', active_only=True, columns=None, **filters):
+        """Percorre todos os registros página a página (paginação por chave).
+        
+        Cada página busca `order_by > último valor visto`, então o custo por página
+        é constante e a memória fica limitada a `page_size` registros. `order_by`
+        deve ser uma coluna única e ordenável (por padrão, a chave primária).
+        Filtros opcionais seguem o formato `coluna__operador=valor`. Um erro em
+        qualquer página é propagado (após o log), nunca tratado como fim dos dados.
+        """
+        backend = cls._backend()
+        if not backend:
+            return
+        
+        if columns and order_by not in columns:
+            columns = list(columns) + [order_by]
+        base_filters = _parse_filters(filters) + cls._active_filters(active_only)
+        
+        ultimo = None
+        while True:
+            try:
+                page_filters = list(base_filters)
+                if ultimo is not None:
+                    page_filters.append((order_by, 'gt', ultimo))
+                rows = backend.select(cls.__tablename__, columns, page_filters,
+                                      order_by=order_by, limit=page_size)
+            except Exception as e:
+                # Propaga: quem percorre não pode tomar uma leitura parcial pela completa
+                logger.error(f"❌ Erro ao percorrer {cls.__name__}: {e}")
+                raise
+            
+            for row in rows:
+                yield row
+            
+            if len(rows) < page_size:
+                return
+            ultimo = rows[-1][order_by]
+    
+    @classmethod
+    def iter_pages(cls, page_size=500, order_by='id', desc=False, columns=None, **filters):
+        """Gera o resultado filtrado em listas de até `page_size` registros, na ordem pedida.
+        
+        Diferente de `iter_all`, aceita ordenação por qualquer coluna (limite e
+        deslocamento no banco), para alimentar as listagens renderizadas em
+        streaming sem carregar o resultado inteiro na memória. Páginas não
+        passam pelo cache de leitura.
+        """
+        backend = cls._backend()
+        if not backend:
+            return
+        
+        parsed = _parse_filters(filters)
+        inicio = 0
+        while True:
+            try:
+                rows = backend.select(cls.__tablename__, columns, parsed, order_by=order_by, desc=desc,
+                                      limit=page_size, offset=inicio)
+            except Exception as e:
+                logger.error(f"❌ Erro ao percorrer páginas de {cls.__name__}: {e}")
+                raise
+            
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            inicio += page_size
+    
+    @classmethod
+    def count(cls, **filters):
+        """Conta os registros no servidor (count=exact), sem transferir as linhas"""
+        try:
+            key = ('count', _filters_key(filters))
+            found, total = read_cache.get(cls.__tablename__, key)
+            if found:
+                return total
+            
+            backend = cls._backend()
+            if backend:
+                total = backend.count(cls.__tablename__, _parse_filters(filters))
+                read_cache.set(cls.__tablename__, key, total)
+                return total
+            return 0
+        except Exception as e:
+            logger.error(f"❌ Erro ao contar {cls.__name__}: {e}")
+            return 0
+    
+    @classmethod
+    def aggregate(cls, func, column, **filters):
+        """Calcula sum/min/max/avg/count de uma coluna no banco.
+        
+        Usa a função `agregar_coluna` (ver supabase_funcoes.sql) via RPC; se ela não
+        estiver instalada, calcula percorrendo apenas a coluna com `iter_all`.
+        """
+        if func not in _AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Função de agregação inválida: {func}")
+        
+        key = ('aggregate', func, column, _filters_key(filters))
+        found, resultado = read_cache.get(cls.__tablename__, key)
+        if found:
+            return resultado
+        
+        backend = cls._backend()
+        if not backend:
+            return None
+        
+        try:
+            filtros = [{'coluna': c, 'op': op, 'valor': v} for c, op, v in _parse_filters(filters)]
+            resultado = backend.rpc('agregar_coluna', {
+                'tabela': cls.__tablename__,
+                'funcao': func,
+                'coluna': column,
+                'filtros': filtros
+            })
+            resultado = float(resultado) if resultado is not None else None
+        except Exception as e:
+            logger.warning(f"⚠️ RPC agregar_coluna indisponível para {cls.__name__}, agregando localmente: {e}")
+            resultado = cls._aggregate_locally(func, column, **filters)
+        
+        read_cache.set(cls.__tablename__, key, resultado)
+        return resultado
+    
+    @classmethod
+    def _aggregate_locally(cls, func, column, **filters):
+        """Agregação em uma única passada, transferindo apenas a coluna agregada"""
+        total = 0.0
+        quantidade = 0
+        minimo = maximo = None
+        for row in cls.iter_all(columns=[column], active_only=False, **filters):
+            valor = row.get(column)
+            if valor is None:
+                continue
+            valor = float(valor)
+            total += valor
+            quantidade += 1
+            minimo = valor if minimo is None else min(minimo, valor)
+            maximo = valor if maximo is None else max(maximo, valor)
+        
+        if func == 'count':
+            return float(quantidade)
+        if quantidade == 0:
+            return None
+        return {'sum': total, 'min': minimo, 'max': maximo, 'avg': total / quantidade}[func]
+    
     @classmethod
     def update(cls, id, **data):
         """Atualiza um registro"""
@@ -75,10 +592,8 @@ class BaseModel:
             logger.info(f"🔄 Tentando atualizar {cls.__name__} com ID: {id}")
             logger.info(f"📝 Dados para atualização: {data}")
             
-            table = cls.get_table()
-            if table:
-                logger.info(f"✅ Tabela {cls.__tablename__} obtida com sucesso")
-                
+            backend = cls._backend()
+            if backend:
                 # Adiciona timestamp de atualização
                 data['updated_at'] = datetime.utcnow().isoformat()
                 logger.info(f"⏰ Timestamp adicionado: {data['updated_at']}")
@@ -86,17 +601,18 @@ class BaseModel:
                 # Log da query que será executada
                 logger.info(f"🔍 Query: UPDATE {cls.__tablename__} SET {data} WHERE id = {id}")
                 
-                response = table.update(data).eq('id', id).execute()
-                logger.info(f"📊 Resposta do Supabase: {response}")
+                rows = backend.update(cls.__tablename__, data, [('id', 'eq', id)])
                 
-                if response.data:
-                    logger.info(f"✅ {cls.__name__} atualizado com sucesso! Dados retornados: {response.data}")
-                    return response.data[0]
+                if rows:
+                    logger.info(f"✅ {cls.__name__} atualizado com sucesso! Dados retornados: {rows}")
+                    cls._remember(rows[0])
+                    return rows[0]
                 else:
                     logger.warning(f"⚠️ Nenhum dado retornado na atualização")
+                    cls._forget(id)
                     return None
             else:
-                logger.error(f"❌ Tabela {cls.__tablename__} não pôde ser obtida")
+                logger.error(f"❌ Backend de dados indisponível para {cls.__tablename__}")
                 return None
         except Exception as e:
             logger.error(f"❌ Erro ao atualizar {cls.__name__}: {e}")
@@ -110,14 +626,18 @@ class BaseModel:
     def delete(cls, id, soft_delete=True):
         """Remove um registro (soft delete por padrão)"""
         try:
-            table = cls.get_table()
-            if table:
+            backend = cls._backend()
+            if backend:
                 if soft_delete and hasattr(cls, 'ativo'):
-                    # Soft delete
-                    response = table.update({'ativo': False, 'updated_at': datetime.utcnow().isoformat()}).eq('id', id).execute()
+                    # Soft delete: o registro continua existindo, apenas inativo
+                    rows = backend.update(cls.__tablename__, {'ativo': False, 'updated_at': datetime.utcnow().isoformat()},
+                                          [('id', 'eq', id)])
+                    cls._forget(id)
+                    cls._remember(*rows)
                 else:
                     # Hard delete
-                    response = table.delete().eq('id', id).execute()
+                    backend.delete(cls.__tablename__, [('id', 'eq', id)])
+                    cls._forget(id)
                 
                 logger.info(f"✅ {cls.__name__} removido com sucesso")
                 return True
@@ -130,16 +650,61 @@ class Usuario(BaseModel):
     """Modelo de Usuário"""
     __tablename__ = 'usuarios'
     
+    SESSION_COLUMNS = ['id', 'username', 'nome', 'ativo']
+    LOGIN_COLUMNS = ['id', 'username', 'nome', 'password', 'ativo']
+    
+    @classmethod
+    def _remember(cls, *rows, created=False):
+        super()._remember(*rows, created=created)
+        session_cache.invalidate(cls.__tablename__)
+    
+    @classmethod
+    def _forget(cls, id):
+        super()._forget(id)
+        session_cache.invalidate(cls.__tablename__)
+    
+    @classmethod
+    def get_session_user(cls, id):
+        """Usuário da sessão pelo ID (cache curto; None se não existir ou estiver inativo).
+        
+        Na falta do cache a leitura vai direto ao banco, sem o cache de leitura geral,
+        para que um usuário desativado perca o acesso em no máximo SESSION_USER_CACHE_TIMEOUT.
+        """
+        try:
+            found, user = session_cache.get(cls.__tablename__, id)
+            if not found:
+                backend = cls._backend()
+                if not backend:
+                    return None
+                rows = backend.select(cls.__tablename__, cls.SESSION_COLUMNS, [('id', 'eq', id)], limit=1)
+                user = rows[0] if rows else None
+                if user is None:
+                    return None
+                session_cache.set(cls.__tablename__, id, user)
+            return user if user.get('ativo', True) else None
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar usuário da sessão {id}: {e}")
+            return None
+    
     @classmethod
     def authenticate(cls, username, password):
-        """Autentica um usuário"""
+        """Autentica um usuário (uma consulta pelo username; usernames inexistentes ficam em cache)"""
         try:
-            table = cls.get_table()
-            if table:
-                response = table.select('*').eq('username', username).eq('ativo', True).execute()
-                user = response.data[0] if response.data else None
+            key = ('inexistente', username)
+            found, _ = session_cache.get(cls.__tablename__, key)
+            if found:
+                return None
+            
+            backend = cls._backend()
+            if backend:
+                rows = backend.select(cls.__tablename__, cls.LOGIN_COLUMNS,
+                                      [('username', 'eq', username)], limit=1)
+                user = rows[0] if rows else None
+                if user is None:
+                    session_cache.set(cls.__tablename__, key, True)
+                    return None
                 
-                if user and user.get('password') == password:  # Em produção, use hash
+                if user.get('ativo', True) and user.get('password') == password:  # Em produção, use hash
                     return user
                 return None
             return None
@@ -152,13 +717,13 @@ class Cliente(BaseModel):
     __tablename__ = 'clientes'
     
     @classmethod
-    def search_by_name(cls, name):
+    def search_by_name(cls, name, columns=None):
         """Busca clientes por nome"""
         try:
-            table = cls.get_table()
-            if table:
-                response = table.select('*').ilike('nome', f'%{name}%').eq('ativo', True).execute()
-                return response.data if response.data else []
+            backend = cls._backend()
+            if backend:
+                return backend.select(cls.__tablename__, columns,
+                                      [('nome', 'ilike', f'%{name}%'), ('ativo', 'eq', True)])
             return []
         except Exception as e:
             logger.error(f"❌ Erro na busca de clientes: {e}")
@@ -173,13 +738,13 @@ class Produto(BaseModel):
     __tablename__ = 'produtos'
     
     @classmethod
-    def get_by_category(cls, categoria_id):
+    def get_by_category(cls, categoria_id, columns=None):
         """Busca produtos por categoria"""
         try:
-            table = cls.get_table()
-            if table:
-                response = table.select('*').eq('categoria_id', categoria_id).eq('ativo', True).execute()
-                return response.data if response.data else []
+            backend = cls._backend()
+            if backend:
+                return backend.select(cls.__tablename__, columns,
+                                      [('categoria_id', 'eq', categoria_id), ('ativo', 'eq', True)])
             return []
         except Exception as e:
             logger.error(f"❌ Erro ao buscar produtos por categoria: {e}")
@@ -188,40 +753,439 @@ class Produto(BaseModel):
 class Estoque(BaseModel):
     """Modelo de Estoque"""
     __tablename__ = 'estoque'
+    __indexes__ = ('produto_id',)
+    
+    @classmethod
+    def get_by_produto(cls, produto_id):
+        """Registro de estoque de um produto (consulta indexada por produto_id)"""
+        return cls.find_one(produto_id=produto_id)
     
     @classmethod
-    def get_low_stock(cls, limit=10):
-        """Busca produtos com estoque baixo"""
+    def get_by_produtos(cls, produto_ids, chunk_size=100):
+        """Estoque de vários produtos com `produto_id in (...)` em lotes: {produto_id: registro}"""
+        produto_ids = [id for id in dict.fromkeys(produto_ids) if id is not None]
+        estoque_por_produto = {}
+        for inicio in range(0, len(produto_ids), chunk_size):
+            for row in cls.find(produto_id__in=produto_ids[inicio:inicio + chunk_size]):
+                # Um registro de estoque por produto (o primeiro encontrado)
+                estoque_por_produto.setdefault(row.get('produto_id'), row)
+        return estoque_por_produto
+    
+    @classmethod
+    def decrement(cls, produto_id, quantidade, tentativas=5):
+        """Baixa atômica de estoque: `quantidade = quantidade - n WHERE quantidade >= n`.
+        
+        Usa a função `baixar_estoque` (ver supabase_funcoes.sql) em uma única
+        chamada; se ela não estiver instalada, faz uma atualização condicional
+        (compare-and-swap) sobre a quantidade lida. Retorna o registro atualizado,
+        ou None se o estoque for insuficiente, o produto não tiver estoque ou a
+        baixa falhar (sem nova tentativa: a falha pode ter ocorrido após gravar).
+        """
+        if quantidade <= 0:
+            raise ValueError("Quantidade deve ser maior que zero")
+        
         try:
-            table = cls.get_table()
-            if table:
-                response = table.select('*, produtos(*)').lte('quantidade', 'quantidade_minima').limit(limit).execute()
-                return response.data if response.data else []
+            rows = cls._baixar(produto_id, quantidade, tentativas)
+        except Exception as e:
+            logger.error(f"❌ Erro ao baixar estoque do produto {produto_id}: {e}")
+            return None
+        row = rows[0] if rows else None
+        if row:
+            logger.info(f"✅ Estoque do produto {produto_id} baixado em {quantidade}: {row.get('quantidade')}")
+        else:
+            logger.warning(f"⚠️ Estoque insuficiente para o produto {produto_id} (solicitado {quantidade})")
+        return row
+    
+    @classmethod
+    def _baixar(cls, produto_id, quantidade, tentativas=5):
+        """Baixa (ou devolve, com quantidade negativa) estoque; retorna as linhas alteradas"""
+        backend = cls._backend()
+        if not backend:
             return []
+        
+        try:
+            rows = backend.rpc('baixar_estoque', {'produto': produto_id, 'qtd': quantidade})
+        except FunctionNotFound as e:
+            # Só quando a função não existe: outros erros podem ter ocorrido após a baixa
+            logger.warning(f"⚠️ RPC baixar_estoque indisponível, usando atualização condicional: {e}")
+            rows = cls._decrement_conditional(backend, produto_id, quantidade, tentativas)
+        
+        if rows:
+            cls._remember(*rows)
+        return rows
+    
+    @classmethod
+    def _decrement_conditional(cls, backend, produto_id, quantidade, tentativas):
+        """Baixa via PostgREST: só grava se a quantidade não mudou desde a leitura"""
+        for _ in range(tentativas):
+            atual = backend.select(cls.__tablename__, ['id', 'quantidade'], [('produto_id', 'eq', produto_id)], limit=1)
+            if not atual or (atual[0].get('quantidade') or 0) < quantidade:
+                return []
+            
+            rows = backend.update(
+                cls.__tablename__,
+                {'quantidade': atual[0]['quantidade'] - quantidade, 'updated_at': datetime.utcnow().isoformat()},
+                [('id', 'eq', atual[0]['id']), ('quantidade', 'eq', atual[0]['quantidade'])]
+            )
+            if rows:
+                return rows
+        raise RuntimeError(f"Estoque do produto {produto_id} alterado concorrentemente {tentativas} vezes")
+    
+    # Colunas da view estoque_baixo (ver supabase_funcoes.sql)
+    LOW_STOCK_COLUMNS = ('id', 'produto_id', 'quantidade', 'quantidade_minima', 'localizacao',
+                         'updated_at', 'produto_nome', 'codigo_barras', 'categoria_id', 'deficit')
+    
+    @classmethod
+    def get_low_stock(cls, limit=10, offset=0, **filters):
+        """Itens com quantidade <= quantidade_minima, do mais crítico (menor quantidade) para o menos.
+        
+        Consulta a view `estoque_baixo` (comparação entre colunas feita no banco, com
+        índice parcial); se ela não existir, calcula percorrendo o estoque.
+        """
+        key = ('baixo', limit, offset, _filters_key(filters))
+        found, rows = read_cache.get(cls.__tablename__, key)
+        if found:
+            return rows
+        
+        try:
+            backend = cls._backend()
+            if not backend:
+                return []
+            try:
+                rows = backend.select('estoque_baixo', None, _parse_filters(filters),
+                                      order_by='quantidade', limit=limit, offset=offset)
+            except Exception as e:
+                logger.warning(f"⚠️ View estoque_baixo indisponível, calculando localmente: {e}")
+                rows = cls._low_stock_locally(**filters)[offset:offset + limit]
+            read_cache.set(cls.__tablename__, key, rows)
+            return rows
         except Exception as e:
             logger.error(f"❌ Erro ao buscar estoque baixo: {e}")
             return []
+    
+    @classmethod
+    def count_low_stock(cls, **filters):
+        """Quantidade de itens com estoque baixo (count=exact na view estoque_baixo)"""
+        key = ('baixo_count', _filters_key(filters))
+        found, total = read_cache.get(cls.__tablename__, key)
+        if found:
+            return total
+        
+        try:
+            backend = cls._backend()
+            if not backend:
+                return 0
+            try:
+                total = backend.count('estoque_baixo', _parse_filters(filters))
+            except Exception as e:
+                logger.warning(f"⚠️ View estoque_baixo indisponível, contando localmente: {e}")
+                total = len(cls._low_stock_locally(**filters))
+            read_cache.set(cls.__tablename__, key, total)
+            return total
+        except Exception as e:
+            logger.error(f"❌ Erro ao contar estoque baixo: {e}")
+            return 0
+    
+    @classmethod
+    def _low_stock_locally(cls, **filters):
+        """Equivalente da view estoque_baixo, percorrendo o estoque em páginas"""
+        filtros = _parse_filters(filters)
+        baixo = [row for row in cls.iter_all(active_only=False)
+                 if (row.get('quantidade') or 0) <= (row.get('quantidade_minima') or 0)]
+        produtos = Produto.get_by_ids([row.get('produto_id') for row in baixo],
+                                      columns=['nome', 'codigo_barras', 'categoria_id'])
+        
+        rows = []
+        for row in baixo:
+            produto = produtos.get(row.get('produto_id'))
+            if not produto:
+                continue
+            item = {column: row.get(column) for column in cls.LOW_STOCK_COLUMNS}
+            item.update({
+                'produto_nome': produto.get('nome'),
+                'codigo_barras': produto.get('codigo_barras'),
+                'categoria_id': produto.get('categoria_id'),
+                'deficit': (row.get('quantidade_minima') or 0) - (row.get('quantidade') or 0)
+            })
+            if _matches(item, filtros):
+                rows.append(item)
+        rows.sort(key=lambda item: (item.get('quantidade') or 0, str(item.get('id'))))
+        return rows
 
 class Venda(BaseModel):
     """Modelo de Venda"""
     __tablename__ = 'vendas'
     
     @classmethod
-    def get_sales_summary(cls, days=30):
-        """Busca resumo de vendas dos últimos dias"""
+    def commit_sale(cls, venda, itens):
+        """Registra uma venda completa: valida o estoque, grava a venda e os itens e baixa o estoque.
+        
+        Usa a função `registrar_venda` (ver supabase_funcoes.sql): uma requisição e
+        uma transação, qualquer que seja o número de itens. Só se ela não existir no
+        banco, executa as etapas pelo PostgREST e desfaz o que já foi gravado se
+        alguma falhar; qualquer outro erro da função retorna None sem repetir a venda.
+        
+        Retorna {'ok': True, 'venda': ..., 'itens': [...], 'estoque': [...]} ou
+        {'ok': False, 'insuficientes': [{'produto_id', 'solicitado', 'disponivel'}]};
+        None em caso de erro.
+        """
+        backend = cls._backend()
+        if not backend:
+            return None
+        
+        venda = dict(venda)
+        # Datas de venda em UTC, o mesmo fuso dos dias dos relatórios (`_period_start`)
+        venda.setdefault('data_venda', datetime.now(timezone.utc).isoformat())
+        itens = [dict(item) for item in itens]
+        for item in itens:
+            item.setdefault('subtotal', item['quantidade'] * item['preco_unitario'])
+        venda.setdefault('total', sum(item['subtotal'] for item in itens))
+        
         try:
-            table = cls.get_table()
-            if table:
-                from datetime import datetime, timedelta
-                start_date = (datetime.now() - timedelta(days=days)).isoformat()
-                
-                response = table.select('*').gte('data_venda', start_date).execute()
-                return response.data if response.data else []
-            return []
+            try:
+                resultado = backend.rpc('registrar_venda', {'venda': venda, 'itens': itens})
+                if resultado.get('ok'):
+                    cls._remember(resultado['venda'], created=True)
+                    ItemVenda._remember(*resultado.get('itens') or [], created=True)
+                    Estoque._remember(*resultado.get('estoque') or [])
+            except FunctionNotFound as e:
+                # Só quando a função não existe: após um timeout ou erro da função a venda
+                # pode já estar gravada, e refazer as etapas a duplicaria
+                logger.warning(f"⚠️ RPC registrar_venda indisponível, gravando a venda em etapas: {e}")
+                # As etapas gravam pelos modelos, que já registram cada escrita
+                resultado = cls._commit_sale_steps(backend, venda, itens)
+        except Exception as e:
+            logger.error(f"❌ Erro ao registrar venda: {e}")
+            return None
+        
+        if resultado.get('ok'):
+            logger.info(f"✅ Venda {resultado['venda'].get('id')} registrada com {len(itens)} itens")
+        return resultado
+    
+    @classmethod
+    def _commit_sale_steps(cls, backend, venda, itens):
+        """Venda em etapas (sem a função no banco), com compensação em caso de falha"""
+        pedido = {}
+        for item in itens:
+            pedido[item['produto_id']] = pedido.get(item['produto_id'], 0) + int(item['quantidade'])
+        
+        # Leitura direta (sem cache) do estoque dos produtos do carrinho
+        disponivel = {
+            row['produto_id']: row.get('quantidade') or 0
+            for row in backend.select(Estoque.__tablename__, ['produto_id', 'quantidade'],
+                                      [('produto_id', 'in', list(pedido))])
+        }
+        insuficientes = [
+            {'produto_id': produto_id, 'solicitado': quantidade, 'disponivel': disponivel.get(produto_id, 0)}
+            for produto_id, quantidade in pedido.items()
+            if disponivel.get(produto_id, 0) < quantidade
+        ]
+        if insuficientes:
+            return {'ok': False, 'insuficientes': insuficientes}
+        
+        baixados = {}
+        estoque = []
+        venda_criada = None
+        concluida = False
+        try:
+            for produto_id, quantidade in pedido.items():
+                rows = Estoque._baixar(produto_id, quantidade)
+                if not rows:
+                    # Outra venda consumiu o estoque depois da validação
+                    insuficientes.append({'produto_id': produto_id, 'solicitado': quantidade,
+                                          'disponivel': disponivel.get(produto_id, 0)})
+                    return {'ok': False, 'insuficientes': insuficientes}
+                baixados[produto_id] = quantidade
+                estoque.extend(rows)
+            
+            venda_criada = cls.create(**venda)
+            if not venda_criada:
+                raise RuntimeError("Falha ao gravar a venda")
+            
+            itens_criados, falhas = ItemVenda.bulk_create(
+                [{**item, 'venda_id': venda_criada['id']} for item in itens]
+            )
+            if falhas:
+                raise RuntimeError(f"Falha ao gravar os itens da venda: {falhas}")
+            
+            concluida = True
+            return {'ok': True, 'venda': venda_criada, 'itens': itens_criados, 'estoque': estoque}
+        finally:
+            if not concluida:
+                # Desfaz o que já foi gravado
+                if venda_criada:
+                    cls.delete(venda_criada['id'], soft_delete=False)
+                for produto_id, quantidade in baixados.items():
+                    Estoque._baixar(produto_id, -quantidade)
+    
+    SUMMARY_PERIODS = ('day', 'week', 'month')
+    
+    @classmethod
+    def get_sales_summary(cls, days=30, period='day', status=None, tipo=None, start=None, end=None):
+        """Resumo de vendas agrupado por período (dia, semana ou mês).
+        
+        Retorna uma lista ordenada de {'periodo': 'AAAA-MM-DD' (início do período),
+        'quantidade', 'total', 'ticket_medio'}. Por padrão cobre os últimos `days`
+        dias; `start`/`end` (datetime ou ISO) definem um intervalo explícito. Filtros
+        opcionais por status (ex.: 'concluida') e tipo ('venda_rapida'/'venda_normal').
+        A agregação é feita no banco pela função `resumo_vendas`; sem ela, as vendas
+        são percorridas em páginas trazendo apenas data e total.
+        """
+        if period not in cls.SUMMARY_PERIODS:
+            raise ValueError(f"Período inválido: {period}")
+        
+        # Início arredondado ao minuto para que chamadas próximas reaproveitem o cache
+        start = start or (datetime.now(timezone.utc) - timedelta(days=days)).replace(second=0, microsecond=0)
+        start = start.isoformat() if isinstance(start, (datetime, date)) else start
+        end = end.isoformat() if isinstance(end, (datetime, date)) else end
+        
+        key = ('resumo', start, end, period, status, tipo)
+        found, resumo = read_cache.get(cls.__tablename__, key)
+        if found:
+            return resumo
+        
+        try:
+            backend = cls._backend()
+            if not backend:
+                return []
+            try:
+                rows = backend.rpc('resumo_vendas', {
+                    'inicio': start,
+                    'fim': end,
+                    'agrupamento': period,
+                    'filtro_status': status,
+                    'filtro_tipo': tipo
+                })
+                resumo = [{
+                    'periodo': str(row['periodo'])[:10],
+                    'quantidade': int(row['quantidade']),
+                    'total': float(row['total'] or 0),
+                    'ticket_medio': float(row['ticket_medio'] or 0)
+                } for row in rows or []]
+            except Exception as e:
+                logger.warning(f"⚠️ RPC resumo_vendas indisponível, agregando localmente: {e}")
+                resumo = cls._sales_summary_locally(start, end, period, status, tipo)
+            
+            read_cache.set(cls.__tablename__, key, resumo)
+            return resumo
         except Exception as e:
             logger.error(f"❌ Erro ao buscar resumo de vendas: {e}")
             return []
+    
+    @staticmethod
+    def _period_start(data_venda, period):
+        """Início do período (dia, semana começando na segunda-feira ou mês) de uma data ISO"""
+        momento = datetime.fromisoformat(str(data_venda).replace('Z', '+00:00'))
+        if momento.tzinfo is not None:
+            momento = momento.astimezone(timezone.utc)
+        dia = momento.date()
+        if period == 'week':
+            return dia - timedelta(days=dia.weekday())
+        if period == 'month':
+            return dia.replace(day=1)
+        return dia
+    
+    @classmethod
+    def _sales_summary_locally(cls, start, end, period, status, tipo):
+        """Agregação em uma passada sobre as vendas do intervalo (apenas data e total)"""
+        filtros = {'data_venda__gte': start}
+        if end:
+            filtros['data_venda__lt'] = end
+        if status:
+            filtros['status'] = status
+        if tipo:
+            filtros['tipo'] = tipo
+        
+        buckets = {}
+        for venda in cls.iter_all(columns=['data_venda', 'total'], active_only=False, **filtros):
+            if not venda.get('data_venda'):
+                continue
+            periodo = cls._period_start(venda['data_venda'], period)
+            bucket = buckets.setdefault(periodo, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += float(venda.get('total') or 0)
+        
+        return [{
+            'periodo': periodo.isoformat(),
+            'quantidade': quantidade,
+            'total': total,
+            'ticket_medio': total / quantidade
+        } for periodo, (quantidade, total) in sorted(buckets.items())]
 
 class ItemVenda(BaseModel):
     """Modelo de Item de Venda"""
     __tablename__ = 'itens_venda'
+    
+    @classmethod
+    def get_sales_by_product(cls, status='concluida', start=None, end=None):
+        """Totais vendidos por produto: {produto_id: {'quantidade', 'total', 'vendas'}}.
+        
+        Considera apenas as vendas com o `status` informado (None para todas) e,
+        opcionalmente, com data_venda em [start, end). O agrupamento é feito no
+        banco pela função `vendas_por_produto`; sem ela, os itens são percorridos
+        uma única vez em páginas, cruzando com o conjunto de vendas filtradas.
+        """
+        start = start.isoformat() if isinstance(start, (datetime, date)) else start
+        end = end.isoformat() if isinstance(end, (datetime, date)) else end
+        
+        key = ('por_produto', status, start, end)
+        found, totais = read_cache.get(cls.__tablename__, key)
+        if found:
+            return totais
+        
+        try:
+            backend = cls._backend()
+            if not backend:
+                return {}
+            try:
+                rows = backend.rpc('vendas_por_produto', {
+                    'filtro_status': status,
+                    'inicio': start,
+                    'fim': end
+                })
+                totais = {str(row['produto_id']): {
+                    'quantidade': int(row['quantidade'] or 0),
+                    'total': float(row['total'] or 0),
+                    'vendas': int(row['vendas'] or 0)
+                } for row in rows or []}
+            except Exception as e:
+                logger.warning(f"⚠️ RPC vendas_por_produto indisponível, agregando localmente: {e}")
+                totais = cls._sales_by_product_locally(status, start, end)
+            
+            read_cache.set(cls.__tablename__, key, totais)
+            return totais
+        except Exception as e:
+            logger.error(f"❌ Erro ao agregar vendas por produto: {e}")
+            return {}
+    
+    @classmethod
+    def _sales_by_product_locally(cls, status, start, end):
+        """Uma passada sobre as vendas filtradas (só IDs) e outra sobre os itens"""
+        filtros = {}
+        if status:
+            filtros['status'] = status
+        if start:
+            filtros['data_venda__gte'] = start
+        if end:
+            filtros['data_venda__lt'] = end
+        vendas = {venda['id'] for venda in Venda.iter_all(columns=['id'], active_only=False, **filtros)}
+        
+        totais = {}
+        vendas_por_produto = {}
+        colunas = ['venda_id', 'produto_id', 'quantidade', 'preco_unitario', 'subtotal']
+        for item in cls.iter_all(columns=colunas, active_only=False):
+            produto_id = item.get('produto_id')
+            if not produto_id or item.get('venda_id') not in vendas:
+                continue
+            quantidade = int(item.get('quantidade') or 0)
+            subtotal = item.get('subtotal')
+            if subtotal is None:
+                subtotal = quantidade * float(item.get('preco_unitario') or 0)
+            total = totais.setdefault(produto_id, {'quantidade': 0, 'total': 0.0, 'vendas': 0})
+            total['quantidade'] += quantidade
+            total['total'] += float(subtotal)
+            vendas_por_produto.setdefault(produto_id, set()).add(item['venda_id'])
+        
+        for produto_id, ids in vendas_por_produto.items():
+            totais[produto_id]['vendas'] = len(ids)
+        return totais
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consultas paralelas para as rotas do Sistema Empresarial
+
+As páginas que montam dados de várias tabelas (dashboard, produtos, estoque,
+nova venda) fazem leituras independentes entre si. `fetch_parallel` executa
+essas leituras em um pool de threads limitado, de modo que a latência total
+fica próxima à da consulta mais lenta em vez da soma de todas.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import contextvars
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ParallelFetcher:
+    """Executa funções de leitura em paralelo com concorrência e timeout limitados"""
+
+    def __init__(self, max_workers=4, timeout=10):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, max_workers=None, timeout=None):
+        """Altera os parâmetros; o pool é recriado na próxima chamada"""
+        with self._lock:
+            if max_workers is not None:
+                self.max_workers = max(1, int(max_workers))
+            if timeout is not None:
+                self.timeout = float(timeout)
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='fetch'
+                    )
+        return self._executor
+
+    def fetch(self, tasks, timeout=None, default=None):
+        """Executa as leituras e retorna {nome: resultado}.
+
+        `tasks` é um dict {nome: função sem argumentos}. Cada função roda em uma
+        cópia do contexto atual, então `flask.g` e o contexto da aplicação
+        continuam acessíveis nas threads do pool. Leituras que falham ou passam
+        do timeout são registradas no log e devolvem `default`.
+        """
+        if not tasks:
+            return {}
+
+        timeout = self.timeout if timeout is None else timeout
+        if len(tasks) == 1 or self.max_workers <= 1:
+            return {name: self._run_inline(name, func, default) for name, func in tasks.items()}
+
+        executor = self._get_executor()
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, func)
+            for name, func in tasks.items()
+        }
+
+        # O timeout vale para cada leitura, contado a partir do envio de todas
+        deadline = time.monotonic() + timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"⚠️ Consulta '{name}' excedeu {timeout}s")
+                results[name] = default
+            except Exception as e:
+                logger.warning(f"⚠️ Erro na consulta '{name}': {e}")
+                results[name] = default
+        return results
+
+    @staticmethod
+    def _run_inline(name, func, default):
+        try:
+            return func()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na consulta '{name}': {e}")
+            return default
+
+    def shutdown(self):
+        """Encerra o pool de threads"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+# Instância global
+parallel_fetcher = ParallelFetcher()
+
+def fetch_parallel(tasks, timeout=None, default=None):
+    """Executa leituras independentes em paralelo (ver ParallelFetcher.fetch)"""
+    return parallel_fetcher.fetch(tasks, timeout=timeout, default=default)
+
+def configure_fetch(config):
+    """Configura o pool de consultas a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    parallel_fetcher.configure(
+        max_workers=value('FETCH_MAX_WORKERS', 4),
+        timeout=value('FETCH_TIMEOUT', 10)
+    )
+    logger.info(f"⚡ Consultas paralelas: até {parallel_fetcher.max_workers} simultâneas, "
+                f"timeout {parallel_fetcher.timeout}s")
+    return parallel_fetcher
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregados diários de vendas para os relatórios
+
+`SalesRollup` mantém, para cada dia, o total e o número de vendas concluídas e
+os acumulados por produto e por cliente. Os relatórios de um intervalo somam
+apenas os dias pedidos, sem percorrer `vendas`/`itens_venda`; a visão por
+categoria combina os acumulados por produto com a categoria atual de cada
+produto, então mudar um produto de categoria não exige recalcular nada.
+
+Os registros lidos não ficam na memória: além dos acumulados, guarda-se só o
+dia de cada venda concluída, para saber que dia uma escrita dos modelos afeta.
+Esse dia é marcado e recontado do banco (apenas as vendas dele) na próxima
+consulta. A contagem completa roda em segundo plano — na primeira consulta e,
+como em `DashboardStats`, periodicamente, para corrigir o que outros processos
+gravaram.
+"""
+
+from datetime import timedelta
+import threading
+import time
+import logging
+
+from models_supabase import Produto, Venda, ItemVenda, add_write_listener
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_VENDA = ('data_venda', 'cliente_id', 'total', 'status')
+COLUNAS_ITEM = ('venda_id', 'produto_id', 'quantidade', 'preco_unitario', 'subtotal')
+
+# Vendas por consulta de itens na contagem: os IDs vão na URL (filtro venda_id__in), então o
+# bloco segue o mesmo limite de `BaseModel.get_by_ids` (500 UUIDs passam de 16KB de URL)
+BLOCO_VENDAS = 100
+
+def _dia(venda):
+    """Dia (UTC) da venda se ela entra nos relatórios (concluída e com data válida), senão None"""
+    if venda.get('status') != 'concluida' or not venda.get('data_venda'):
+        return None
+    try:
+        return Venda._period_start(venda['data_venda'], 'day')
+    except ValueError:
+        logger.warning(f"⚠️ Venda {venda.get('id')} com data inválida fora dos relatórios: {venda['data_venda']}")
+        return None
+
+def _blocos(rows, tamanho=BLOCO_VENDAS):
+    bloco = []
+    for row in rows:
+        bloco.append(row)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+class _Agregados:
+    """Acumulados por dia e o dia de cada venda concluída"""
+
+    def __init__(self):
+        self.categorias = {}
+        # dia -> [valor, vendas]
+        self.dias = {}
+        # dia -> {produto_id: [quantidade, receita, vendas]}
+        self.produtos = {}
+        # dia -> {cliente_id: [total, compras]}
+        self.clientes = {}
+        # venda_id -> dia, para localizar as escritas de vendas e itens
+        self.dia_da_venda = {}
+        # Dias afetados por escritas, recontados na próxima consulta
+        self.sujos = set()
+        # Escrita que não dá para localizar (item removido): pede uma contagem completa
+        self.incompletos = False
+
+    def contar(self, vendas):
+        """Soma um bloco de vendas concluídas e os itens delas (lidos do banco) aos acumulados"""
+        dias = {}
+        for venda in vendas:
+            dia = _dia(venda)
+            if dia is None:
+                continue
+            dias[venda['id']] = dia
+            self.dia_da_venda[venda['id']] = dia
+            total = float(venda.get('total') or 0)
+
+            acumulado = self.dias.setdefault(dia, [0.0, 0])
+            acumulado[0] += total
+            acumulado[1] += 1
+
+            cliente = self.clientes.setdefault(dia, {}).setdefault(venda.get('cliente_id'), [0.0, 0])
+            cliente[0] += total
+            cliente[1] += 1
+
+        if not dias:
+            return
+        # produto -> (quantidade, receita) de cada venda do bloco
+        por_venda = {}
+        for item in ItemVenda.iter_all(active_only=False, columns=['id', *COLUNAS_ITEM], venda_id__in=list(dias)):
+            quantidade = int(item.get('quantidade') or 0)
+            subtotal = item.get('subtotal')
+            receita = float(subtotal if subtotal is not None else quantidade * float(item.get('preco_unitario') or 0))
+            produtos = por_venda.setdefault(item['venda_id'], {})
+            anterior = produtos.get(item.get('produto_id'), (0, 0.0))
+            produtos[item.get('produto_id')] = (anterior[0] + quantidade, anterior[1] + receita)
+
+        for venda_id, produtos in por_venda.items():
+            produtos_dia = self.produtos.setdefault(dias[venda_id], {})
+            for produto_id, (quantidade, receita) in produtos.items():
+                produto = produtos_dia.setdefault(produto_id, [0, 0.0, 0])
+                produto[0] += quantidade
+                produto[1] += receita
+                produto[2] += 1
+
+    def escrever(self, tabela, rows, removed):
+        """Marca os dias afetados por uma escrita dos modelos (mesma assinatura dos observadores)"""
+        if tabela == 'produtos':
+            for id in removed:
+                self.categorias.pop(id, None)
+            for row in rows:
+                if row.get('id') is not None and 'categoria_id' in row:
+                    self.categorias[row['id']] = row['categoria_id']
+            return
+
+        if tabela == 'vendas':
+            for id in removed:
+                dia = self.dia_da_venda.pop(id, None)
+                if dia is not None:
+                    self.sujos.add(dia)
+            for row in rows:
+                # Dia em que a venda estava e dia em que ela passa a contar
+                for dia in (self.dia_da_venda.get(row.get('id')), _dia(row)):
+                    if dia is not None:
+                        self.sujos.add(dia)
+            return
+
+        if removed:
+            self.incompletos = True
+        for row in rows:
+            dia = self.dia_da_venda.get(row.get('venda_id'))
+            if dia is not None:
+                self.sujos.add(dia)
+
+    def substituir_dia(self, dia, recontado):
+        """Troca os acumulados do dia pelos de `recontado` (que contou só as vendas desse dia)"""
+        for nome in ('dias', 'produtos', 'clientes'):
+            acumulados, novos = getattr(self, nome), getattr(recontado, nome)
+            if dia in novos:
+                acumulados[dia] = novos[dia]
+            else:
+                acumulados.pop(dia, None)
+        self.dia_da_venda.update(recontado.dia_da_venda)
+
+    def dias_do_intervalo(self, acumulados, inicio, fim):
+        """Dias com movimento em [inicio, fim], percorrendo o que for menor (intervalo ou agregados)"""
+        if (fim - inicio).days + 1 > len(acumulados):
+            return sorted(dia for dia in acumulados if inicio <= dia <= fim)
+        return [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)
+                if inicio + timedelta(days=n) in acumulados]
+
+class SalesRollup:
+    """Relatórios de vendas respondidos a partir dos agregados diários"""
+
+    TABELAS = ('vendas', 'itens_venda', 'produtos')
+
+    def __init__(self, reconcile_interval=600):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._agregados = _Agregados()
+        self._reconciled_at = None
+        self._pendentes = None
+
+    def on_write(self, tablename, rows, removed, created=False):
+        """Observador das escritas dos modelos (ver models_supabase.add_write_listener)"""
+        if tablename not in self.TABELAS:
+            return
+        with self._lock:
+            if self._reconciled_at is None and self._pendentes is None:
+                return
+            if self._pendentes is not None:
+                # Reaplicadas sobre o resultado da contagem em andamento
+                self._pendentes.append((tablename, rows, removed))
+            self._agregados.escrever(tablename, rows, removed)
+
+    def reconcile(self):
+        """Remonta os agregados a partir do banco (vendas concluídas, itens e categoria dos produtos)"""
+        with self._lock:
+            if self._pendentes is not None:
+                return False
+            self._pendentes = []
+
+        try:
+            inicio = time.monotonic()
+            agregados = _Agregados()
+            for row in Produto.iter_all(active_only=False, columns=['id', 'categoria_id']):
+                agregados.categorias[row['id']] = row.get('categoria_id')
+            vendas = Venda.iter_all(active_only=False, columns=['id', *COLUNAS_VENDA], status='concluida')
+            for bloco in _blocos(vendas):
+                agregados.contar(bloco)
+
+            with self._lock:
+                self._agregados = agregados
+                for evento in self._pendentes:
+                    agregados.escrever(*evento)
+                self._pendentes = None
+                self._reconciled_at = time.monotonic()
+
+            logger.info(f"✅ Agregados de vendas recontados em {time.monotonic() - inicio:.2f}s "
+                        f"({len(agregados.dia_da_venda)} vendas, {len(agregados.dias)} dias)")
+            return True
+        except Exception as e:
+            with self._lock:
+                self._pendentes = None
+            logger.error(f"❌ Erro ao recontar agregados de vendas: {e}")
+            return False
+
+    def _recontar_em_segundo_plano(self):
+        threading.Thread(target=self.reconcile, name='sales-rollup', daemon=True).start()
+
+    def _recontar_dias(self):
+        """Reconta do banco só as vendas dos dias marcados pelas escritas"""
+        with self._lock:
+            agregados = self._agregados
+            dias, agregados.sujos = agregados.sujos, set()
+        if not dias:
+            return True
+
+        try:
+            recontados = {}
+            for dia in dias:
+                recontado = recontados[dia] = _Agregados()
+                # Janela com um dia de folga: o dia da venda é calculado em UTC
+                vendas = Venda.iter_all(active_only=False, columns=['id', *COLUNAS_VENDA], status='concluida',
+                                        data_venda__gte=(dia - timedelta(days=1)).isoformat(),
+                                        data_venda__lt=(dia + timedelta(days=2)).isoformat())
+                for bloco in _blocos(venda for venda in vendas if _dia(venda) == dia):
+                    recontado.contar(bloco)
+        except Exception as e:
+            with self._lock:
+                self._agregados.sujos |= dias
+            logger.error(f"❌ Erro ao recontar dias dos agregados de vendas: {e}")
+            return False
+
+        with self._lock:
+            for dia, recontado in recontados.items():
+                self._agregados.substituir_dia(dia, recontado)
+        return True
+
+    def is_ready(self):
+        """Indica se os agregados estão disponíveis, atualizando os dias alterados desde a última consulta.
+
+        A contagem completa nunca roda na requisição: enquanto a primeira não
+        termina a resposta é False (ela é iniciada em segundo plano) e, passado
+        `reconcile_interval`, a recontagem também é feita em segundo plano.
+        """
+        if self._reconciled_at is None:
+            if self._pendentes is None:
+                self._recontar_em_segundo_plano()
+            return False
+        if self._pendentes is None and (self._agregados.incompletos or (
+                self.reconcile_interval > 0 and
+                time.monotonic() - self._reconciled_at >= self.reconcile_interval)):
+            self._recontar_em_segundo_plano()
+        self._recontar_dias()
+        return True
+
+    def por_dia(self, inicio, fim):
+        """[{'dia', 'valor', 'vendas'}] para cada dia de [inicio, fim] (dias sem venda zerados)"""
+        with self._lock:
+            dias = self._agregados.dias
+            serie = []
+            for n in range((fim - inicio).days + 1):
+                dia = inicio + timedelta(days=n)
+                valor, vendas = dias.get(dia, (0.0, 0))
+                serie.append({'dia': dia, 'valor': round(valor, 2), 'vendas': vendas})
+            return serie
+
+    def por_produto(self, inicio, fim):
+        """{produto_id: {'quantidade', 'receita', 'vendas'}} das vendas concluídas em [inicio, fim]"""
+        with self._lock:
+            agregados = self._agregados
+            totais = {}
+            for dia in agregados.dias_do_intervalo(agregados.produtos, inicio, fim):
+                for produto_id, (quantidade, receita, vendas) in agregados.produtos[dia].items():
+                    total = totais.setdefault(produto_id, [0, 0.0, 0])
+                    total[0] += quantidade
+                    total[1] += receita
+                    total[2] += vendas
+        return {produto_id: {'quantidade': quantidade, 'receita': round(receita, 2), 'vendas': vendas}
+                for produto_id, (quantidade, receita, vendas) in totais.items()}
+
+    def por_categoria(self, inicio, fim):
+        """{categoria_id: {'quantidade', 'valor'}} combinando os produtos pela categoria atual"""
+        por_produto = self.por_produto(inicio, fim)
+        totais = {}
+        with self._lock:
+            categorias = self._agregados.categorias
+            for produto_id, produto in por_produto.items():
+                total = totais.setdefault(categorias.get(produto_id), [0, 0.0])
+                total[0] += produto['quantidade']
+                total[1] += produto['receita']
+        return {categoria_id: {'quantidade': quantidade, 'valor': round(valor, 2)}
+                for categoria_id, (quantidade, valor) in totais.items()}
+
+    def por_cliente(self, inicio, fim):
+        """{cliente_id: {'total', 'compras'}} das vendas concluídas em [inicio, fim]"""
+        with self._lock:
+            agregados = self._agregados
+            totais = {}
+            for dia in agregados.dias_do_intervalo(agregados.clientes, inicio, fim):
+                for cliente_id, (total, compras) in agregados.clientes[dia].items():
+                    acumulado = totais.setdefault(cliente_id, [0.0, 0])
+                    acumulado[0] += total
+                    acumulado[1] += compras
+        return {cliente_id: {'total': round(total, 2), 'compras': compras}
+                for cliente_id, (total, compras) in totais.items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'vendas': len(self._agregados.dia_da_venda),
+                'dias': len(self._agregados.dias),
+                'dias_pendentes': len(self._agregados.sujos),
+                'reconcile_interval': self.reconcile_interval,
+                'idade': round(time.monotonic() - self._reconciled_at, 1) if self._reconciled_at else None,
+                'recontando': self._pendentes is not None
+            }
+
+# Instância global
+sales_rollup = SalesRollup()
+add_write_listener(sales_rollup.on_write)
+
+def configure_sales_rollup(config):
+    """Configura o intervalo de recontagem a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    sales_rollup.reconcile_interval = int(value('SALES_ROLLUP_RECONCILE_INTERVAL', 600))
+    logger.info(f"📈 Agregados de vendas: recontagem a cada {sales_rollup.reconcile_interval}s")
+    return sales_rollup
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Situação do estoque por produto em arrays NumPy
+
+`StockSnapshot` guarda a quantidade e a quantidade mínima de cada produto em
+arrays alinhados e classifica todos de uma vez (sem estoque, estoque baixo,
+atenção, ok). As páginas de produtos e estoque e o dashboard leem a mesma
+cópia; as escritas de estoque feitas pelos modelos atualizam só a posição do
+produto alterado, e a cópia é recarregada por inteiro após o TTL ou quando o
+catálogo muda.
+"""
+
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# O código da situação é também a prioridade de exibição (críticos primeiro)
+SEM_ESTOQUE, ESTOQUE_BAIXO, ATENCAO, OK = range(4)
+STATUS = ('sem_estoque', 'estoque_baixo', 'atencao', 'ok')
+
+# Texto, cor e ícone de cada situação nas páginas
+STATUS_INFO = (
+    {'status_texto': 'Sem Estoque', 'status_cor': 'danger', 'status_icone': 'bi-x-circle'},
+    {'status_texto': 'Estoque Baixo', 'status_cor': 'warning', 'status_icone': 'bi-exclamation-triangle'},
+    {'status_texto': 'Atenção', 'status_cor': 'info', 'status_icone': 'bi-info-circle'},
+    {'status_texto': 'OK', 'status_cor': 'success', 'status_icone': 'bi-check-circle'}
+)
+
+def classify(quantidade, minima):
+    """Códigos de situação para arrays de quantidade e quantidade mínima"""
+    quantidade = np.asarray(quantidade)
+    minima = np.asarray(minima)
+    codigos = np.full(quantidade.shape, OK, dtype=np.int8)
+    codigos[quantidade <= minima * 2] = ATENCAO
+    codigos[quantidade <= minima] = ESTOQUE_BAIXO
+    codigos[quantidade <= 0] = SEM_ESTOQUE
+    return codigos
+
+def classify_products(produto_ids, estoque_por_produto):
+    """Códigos de situação a partir de {produto_id: registro de estoque} (sem a cópia global)"""
+    estoques = [estoque_por_produto.get(id) or {} for id in produto_ids]
+    return classify(np.fromiter((e.get('quantidade') or 0 for e in estoques), dtype=np.int64, count=len(estoques)),
+                    np.fromiter((e.get('quantidade_minima') or 0 for e in estoques), dtype=np.int64, count=len(estoques)))
+
+class StockSnapshot:
+    """Quantidades, mínimos e situação do estoque de todos os produtos"""
+
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._posicoes = {}
+        self._ids = []
+        self._posicoes_estoque = {}
+        self.tem_estoque = np.zeros(0, dtype=bool)
+        self.quantidade = np.zeros(0, dtype=np.int64)
+        self.minima = np.zeros(0, dtype=np.int64)
+        self.codigos = np.zeros(0, dtype=np.int8)
+        self._loaded_at = None
+        self.loaded = False
+
+    def is_fresh(self):
+        """Indica se a cópia está dentro do TTL (TTL <= 0: recarregar sempre, como no ReadCache)"""
+        if self._loaded_at is None or self.timeout <= 0:
+            return False
+        return time.monotonic() - self._loaded_at < self.timeout
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def load(self, produto_ids, estoque_rows):
+        """Monta os arrays para os produtos informados (produto sem estoque conta como 0)"""
+        produto_ids = list(produto_ids)
+        posicoes = {id: posicao for posicao, id in enumerate(produto_ids)}
+        quantidade = np.zeros(len(posicoes), dtype=np.int64)
+        minima = np.zeros(len(posicoes), dtype=np.int64)
+        tem_estoque = np.zeros(len(posicoes), dtype=bool)
+        posicoes_estoque = {}
+        for row in estoque_rows:
+            posicao = posicoes.get(row.get('produto_id'))
+            # Um registro de estoque por produto (o primeiro encontrado, como em Estoque.indexed)
+            if posicao is None or tem_estoque[posicao]:
+                continue
+            tem_estoque[posicao] = True
+            posicoes_estoque[row['id']] = posicao
+            quantidade[posicao] = int(row.get('quantidade') or 0)
+            minima[posicao] = int(row.get('quantidade_minima') or 0)
+
+        with self._lock:
+            self._posicoes = posicoes
+            self._ids = produto_ids
+            self._posicoes_estoque = posicoes_estoque
+            self.tem_estoque = tem_estoque
+            self.quantidade = quantidade
+            self.minima = minima
+            self.codigos = classify(quantidade, minima)
+            self._loaded_at = time.monotonic()
+            self.loaded = True
+        logger.info(f"✅ Situação do estoque carregada: {len(posicoes)} produtos")
+
+    def on_write(self, tablename, rows, removed, created=False):
+        """Observador das escritas dos modelos (ver models_supabase.add_write_listener)"""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            if tablename == 'produtos':
+                # Produto novo ou removido muda o alinhamento dos arrays: recarregar
+                if removed or any(row.get('id') not in self._posicoes for row in rows):
+                    self._loaded_at = None
+            elif tablename == 'estoque':
+                for id in removed:
+                    posicao = self._posicoes_estoque.pop(id, None)
+                    if posicao is not None:
+                        self.tem_estoque[posicao] = False
+                        self._set(posicao, 0, 0)
+                for row in rows:
+                    posicao = self._posicoes_estoque.get(row.get('id'))
+                    if posicao is None:
+                        posicao = self._posicoes.get(row.get('produto_id'))
+                        if posicao is None or self.tem_estoque[posicao]:
+                            continue
+                        self.tem_estoque[posicao] = True
+                        self._posicoes_estoque[row['id']] = posicao
+                    self._set(posicao, row.get('quantidade', self.quantidade[posicao]),
+                              row.get('quantidade_minima', self.minima[posicao]))
+
+    def _set(self, posicao, quantidade, minima):
+        self.quantidade[posicao] = int(quantidade or 0)
+        self.minima[posicao] = int(minima or 0)
+        self.codigos[posicao] = classify(self.quantidade[posicao], self.minima[posicao])
+
+    def codes_for(self, produto_ids):
+        """Códigos de situação alinhados à lista de IDs (produto desconhecido = sem estoque)"""
+        with self._lock:
+            posicoes = np.fromiter((self._posicoes.get(id, -1) for id in produto_ids), dtype=np.int64)
+            codigos = np.full(len(posicoes), SEM_ESTOQUE, dtype=np.int8)
+            conhecidos = posicoes >= 0
+            codigos[conhecidos] = self.codigos[posicoes[conhecidos]]
+            return codigos
+
+    @staticmethod
+    def critical_first(codigos):
+        """Índices que ordenam os produtos por situação (críticos primeiro, ordem estável)"""
+        return np.argsort(codigos, kind='stable')
+
+    def page(self, page=1, per_page=50, status=None, produto_ids=None):
+        """IDs de uma página de produtos em ordem "críticos primeiro" e o total filtrado.
+        
+        `status` restringe a um código de situação e `produto_ids` a um subconjunto
+        (ex.: resultado de uma busca por nome).
+        """
+        with self._lock:
+            if produto_ids is not None:
+                posicoes = np.fromiter((self._posicoes.get(id, -1) for id in produto_ids), dtype=np.int64)
+                posicoes = np.unique(posicoes[posicoes >= 0])
+            else:
+                posicoes = np.arange(len(self.codigos))
+            if status is not None:
+                # Mesma situação: a ordem estável é a própria ordem das posições
+                ordem = posicoes[self.codigos[posicoes] == status]
+            else:
+                ordem = posicoes[np.argsort(self.codigos[posicoes], kind='stable')]
+            inicio = (page - 1) * per_page
+            return [self._ids[posicao] for posicao in ordem[inicio:inicio + per_page].tolist()], len(ordem)
+
+    def counts(self):
+        """Quantidade de produtos em cada situação"""
+        with self._lock:
+            contagem = np.bincount(self.codigos, minlength=len(STATUS))
+        return {status: int(total) for status, total in zip(STATUS, contagem)}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'produtos': len(self._posicoes),
+                'com_estoque': len(self._posicoes_estoque),
+                'situacao': self.counts(),
+                'idade': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None
+            }
+
+# Instância global
+stock_snapshot = StockSnapshot()
+_load_lock = threading.Lock()
+
+def get_stock_snapshot():
+    """Situação do estoque atual, recarregada do banco quando expirada"""
+    from models_supabase import Produto, Estoque
+    
+    if not stock_snapshot.is_fresh():
+        with _load_lock:
+            if not stock_snapshot.is_fresh():
+                try:
+                    produto_ids = [row['id'] for row in Produto.iter_all(columns=['id'])]
+                    estoque_rows = list(Estoque.iter_all(active_only=False,
+                                                         columns=['id', 'produto_id', 'quantidade', 'quantidade_minima']))
+                except Exception as e:
+                    # Leitura incompleta: segue com a cópia anterior, se já houve alguma
+                    if not stock_snapshot.loaded:
+                        raise
+                    logger.warning(f"⚠️ Situação do estoque não recarregada, usando a cópia anterior: {e}")
+                    return stock_snapshot
+                stock_snapshot.load(produto_ids, estoque_rows)
+    return stock_snapshot
+
+def configure_stock_snapshot(config):
+    """Configura o TTL da situação do estoque a partir das configurações da aplicação (dict ou objeto)"""
+    def value(name, default=None):
+        if isinstance(config, dict):
+            return config.get(name, default)
+        return getattr(config, name, default)
+
+    from models_supabase import add_write_listener
+    from cache_supabase import read_cache
+    
+    # Com o cache desativado (CACHE_TYPE='null') a situação também é lida a cada uso
+    stock_snapshot.timeout = int(value('STOCK_SNAPSHOT_TIMEOUT', 300)) if read_cache.enabled else 0
+    stock_snapshot.invalidate()
+    add_write_listener(stock_snapshot.on_write)
+    return stock_snapshot
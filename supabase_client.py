@@ -5,7 +5,10 @@ Cliente Supabase para o Sistema Empresarial
 """
 
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from httpx import Timeout
 from config_producao import config
+import threading
 import logging
 
 # Configurar logging
@@ -13,19 +16,68 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class SupabaseManager:
-    """Gerenciador de conexão com Supabase"""
+    """Gerenciador de conexão com Supabase.
     
-    def __init__(self):
-        """Inicializa o cliente Supabase"""
+    Mantém um pequeno pool de clientes (cada um com sua própria sessão HTTP
+    keep-alive). Cada thread recebe um cliente fixo do pool na primeira vez que
+    acessa o banco, então as requisições concorrentes não disputam uma única
+    sessão e as conexões TCP/TLS são reaproveitadas entre chamadas.
+    """
+    
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None):
+        """Inicializa o pool e valida as credenciais com o primeiro cliente"""
+        self.pool_size = max(1, int(pool_size or getattr(config, 'SUPABASE_POOL_SIZE', 4)))
+        self.connect_timeout = float(connect_timeout or getattr(config, 'SUPABASE_CONNECT_TIMEOUT', 5))
+        self.read_timeout = float(read_timeout or getattr(config, 'SUPABASE_READ_TIMEOUT', 15))
+        self._clients = []
+        self._next_client = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+        primeiro = self._create_client()
+        if primeiro:
+            self._clients.append(primeiro)
+            logger.info(f"✅ Cliente Supabase conectado com sucesso! (pool de até {self.pool_size} clientes)")
+    
+    def _create_client(self):
+        """Cria um cliente Supabase com os timeouts configurados"""
         try:
-            self.client: Client = create_client(
-                config.SUPABASE_URL,
-                config.SUPABASE_KEY
+            options = ClientOptions(
+                postgrest_client_timeout=Timeout(self.read_timeout, connect=self.connect_timeout)
             )
-            logger.info("✅ Cliente Supabase conectado com sucesso!")
+            return create_client(config.SUPABASE_URL, config.SUPABASE_KEY, options=options)
         except Exception as e:
             logger.error(f"❌ Erro ao conectar com Supabase: {e}")
-            self.client = None
+            return None
+    
+    @property
+    def client(self) -> Client:
+        """Cliente Supabase da thread atual (None se as credenciais forem inválidas)"""
+        client = getattr(self._local, 'client', None)
+        if client is not None:
+            return client
+        
+        with self._lock:
+            if not self._clients:
+                return None
+            if len(self._clients) < self.pool_size:
+                novo = self._create_client()
+                if novo:
+                    self._clients.append(novo)
+            client = self._clients[self._next_client % len(self._clients)]
+            self._next_client += 1
+        
+        self._local.client = client
+        return client
+    
+    def get_pool_status(self):
+        """Retorna a configuração e o uso atual do pool de clientes"""
+        return {
+            'pool_size': self.pool_size,
+            'clients': len(self._clients),
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout
+        }
     
     def test_connection(self):
         """Testa a conexão com o Supabase"""
@@ -43,11 +95,9 @@ class SupabaseManager:
     def get_table(self, table_name: str):
         """Retorna uma referência para uma tabela"""
         try:
-            if self.client:
-                logger.info(f"🔍 Obtendo tabela: {table_name}")
-                table = self.client.table(table_name)
-                logger.info(f"✅ Tabela {table_name} obtida com sucesso")
-                return table
+            client = self.client
+            if client:
+                return client.table(table_name)
             else:
                 logger.error(f"❌ Cliente Supabase não disponível")
                 return None
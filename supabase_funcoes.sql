@@ -0,0 +1,254 @@
+-- =====================================================================
+-- Funções e views do Sistema Empresarial (Supabase / PostgreSQL)
+-- Execute este arquivo no SQL Editor do Supabase (pode ser reexecutado).
+-- =====================================================================
+
+-- ---------------------------------------------------------------------
+-- agregar_coluna: sum/min/max/avg/count de uma coluna com filtros
+-- Usada por BaseModel.aggregate (models_supabase.py).
+-- filtros: [{"coluna": "status", "op": "eq", "valor": "concluida"}, ...]
+-- ---------------------------------------------------------------------
+create or replace function agregar_coluna(
+    tabela text,
+    funcao text,
+    coluna text,
+    filtros jsonb default '[]'::jsonb
+)
+returns numeric
+language plpgsql
+stable
+as $$
+declare
+    operadores constant jsonb := '{"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "ilike": "ilike"}';
+    filtro jsonb;
+    condicoes text := 'true';
+    resultado numeric;
+begin
+    if funcao not in ('sum', 'min', 'max', 'avg', 'count') then
+        raise exception 'Função de agregação inválida: %', funcao;
+    end if;
+
+    if tabela not in ('usuarios', 'clientes', 'categorias', 'produtos', 'estoque', 'vendas', 'itens_venda') then
+        raise exception 'Tabela não permitida: %', tabela;
+    end if;
+
+    for filtro in select * from jsonb_array_elements(coalesce(filtros, '[]'::jsonb)) loop
+        if not operadores ? (filtro->>'op') then
+            raise exception 'Operador de filtro não suportado: %', filtro->>'op';
+        end if;
+        condicoes := condicoes || format(' and t.%I %s %L',
+            filtro->>'coluna', operadores->>(filtro->>'op'), filtro->>'valor');
+    end loop;
+
+    execute format('select %s(t.%I)::numeric from %I t where %s', funcao, coluna, tabela, condicoes)
+        into resultado;
+    return resultado;
+end;
+$$;
+
+-- ---------------------------------------------------------------------
+-- baixar_estoque: baixa atômica do estoque de um produto
+-- Usada por Estoque.decrement (models_supabase.py).
+-- Retorna o registro de estoque atualizado; nenhum registro significa
+-- estoque insuficiente (ou produto sem estoque cadastrado).
+-- ---------------------------------------------------------------------
+create or replace function baixar_estoque(produto uuid, qtd integer)
+returns setof estoque
+language sql
+volatile
+as $$
+    update estoque
+       set quantidade = quantidade - qtd,
+           updated_at = now()
+     where produto_id = produto
+       and quantidade >= qtd
+    returning *;
+$$;
+
+-- ---------------------------------------------------------------------
+-- registrar_venda: venda completa em uma transação e uma requisição
+-- Usada por Venda.commit_sale (models_supabase.py).
+-- venda: {"cliente_id": ..., "data_venda": ..., "total": ..., "status": ..., "tipo": ...}
+-- itens: [{"produto_id": ..., "quantidade": 2, "preco_unitario": 9.9, "subtotal": 19.8}, ...]
+-- Retorna {"ok": true, "venda": {...}, "itens": [...], "estoque": [...]} ou
+-- {"ok": false, "insuficientes": [{"produto_id", "solicitado", "disponivel"}]}
+-- sem gravar nada.
+-- ---------------------------------------------------------------------
+create or replace function registrar_venda(venda jsonb, itens jsonb)
+returns jsonb
+language plpgsql
+volatile
+as $$
+declare
+    faltando jsonb;
+    nova_venda vendas;
+    itens_gravados jsonb;
+    estoque_atualizado jsonb;
+begin
+    -- Trava as linhas de estoque do carrinho até o fim da transação
+    perform 1
+       from estoque e
+      where e.produto_id in (select (i->>'produto_id')::uuid from jsonb_array_elements(itens) i)
+        for update;
+
+    -- Quantidade total por produto (o mesmo produto pode aparecer em mais de uma linha)
+    select coalesce(jsonb_agg(jsonb_build_object(
+               'produto_id', p.produto_id,
+               'solicitado', p.quantidade,
+               'disponivel', coalesce(e.quantidade, 0))), '[]'::jsonb)
+      into faltando
+      from (select (i->>'produto_id')::uuid as produto_id, sum((i->>'quantidade')::integer) as quantidade
+              from jsonb_array_elements(itens) i
+             group by 1) p
+      left join estoque e on e.produto_id = p.produto_id
+     where coalesce(e.quantidade, 0) < p.quantidade;
+
+    if jsonb_array_length(faltando) > 0 then
+        return jsonb_build_object('ok', false, 'insuficientes', faltando);
+    end if;
+
+    insert into vendas (cliente_id, data_venda, total, status, tipo)
+    values (
+        nullif(venda->>'cliente_id', '')::uuid,
+        coalesce((venda->>'data_venda')::timestamptz, now()),
+        coalesce((venda->>'total')::numeric,
+                 (select sum(coalesce((i->>'subtotal')::numeric,
+                                      (i->>'quantidade')::integer * (i->>'preco_unitario')::numeric))
+                    from jsonb_array_elements(itens) i)),
+        coalesce(venda->>'status', 'concluida'),
+        venda->>'tipo'
+    )
+    returning * into nova_venda;
+
+    with gravados as (
+        insert into itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal)
+        select nova_venda.id,
+               (i->>'produto_id')::uuid,
+               (i->>'quantidade')::integer,
+               (i->>'preco_unitario')::numeric,
+               coalesce((i->>'subtotal')::numeric, (i->>'quantidade')::integer * (i->>'preco_unitario')::numeric)
+          from jsonb_array_elements(itens) i
+        returning *
+    )
+    select coalesce(jsonb_agg(to_jsonb(gravados)), '[]'::jsonb) into itens_gravados from gravados;
+
+    with atualizados as (
+        update estoque e
+           set quantidade = e.quantidade - p.quantidade,
+               updated_at = now()
+          from (select (i->>'produto_id')::uuid as produto_id, sum((i->>'quantidade')::integer) as quantidade
+              from jsonb_array_elements(itens) i
+             group by 1) p
+         where e.produto_id = p.produto_id
+        returning e.*
+    )
+    select coalesce(jsonb_agg(to_jsonb(atualizados)), '[]'::jsonb) into estoque_atualizado from atualizados;
+
+    return jsonb_build_object(
+        'ok', true,
+        'venda', to_jsonb(nova_venda),
+        'itens', itens_gravados,
+        'estoque', estoque_atualizado
+    );
+end;
+$$;
+
+-- ---------------------------------------------------------------------
+-- estoque_baixo: itens com quantidade <= quantidade_minima
+-- Usada por Estoque.get_low_stock / count_low_stock e /api/estoque/baixo.
+-- O índice parcial contém apenas as linhas em falta, então a consulta não
+-- percorre o estoque inteiro mesmo com dezenas de milhares de SKUs.
+-- ---------------------------------------------------------------------
+create index if not exists idx_estoque_baixo
+    on estoque (quantidade, id)
+    where quantidade <= quantidade_minima;
+
+create or replace view estoque_baixo as
+select e.id,
+       e.produto_id,
+       e.quantidade,
+       e.quantidade_minima,
+       e.localizacao,
+       e.updated_at,
+       p.nome as produto_nome,
+       p.codigo_barras,
+       p.categoria_id,
+       e.quantidade_minima - e.quantidade as deficit
+  from estoque e
+  join produtos p on p.id = e.produto_id
+ where e.quantidade <= e.quantidade_minima;
+
+-- ---------------------------------------------------------------------
+-- resumo_vendas: vendas agregadas por dia, semana ou mês
+-- Usada por Venda.get_sales_summary (models_supabase.py).
+-- Retorna uma linha por período (início do período como data) com a
+-- quantidade de vendas, a soma de total e o ticket médio.
+-- ---------------------------------------------------------------------
+create index if not exists idx_vendas_data_venda on vendas (data_venda);
+
+create or replace function resumo_vendas(
+    inicio timestamptz,
+    fim timestamptz default null,
+    agrupamento text default 'day',
+    filtro_status text default null,
+    filtro_tipo text default null
+)
+returns table (periodo date, quantidade bigint, total numeric, ticket_medio numeric)
+language sql
+stable
+as $$
+    select date_trunc(agrupamento, v.data_venda)::date,
+           count(*),
+           coalesce(sum(v.total), 0),
+           coalesce(avg(v.total), 0)
+      from vendas v
+     where v.data_venda >= inicio
+       and (fim is null or v.data_venda < fim)
+       and (filtro_status is null or v.status = filtro_status)
+       and (filtro_tipo is null or v.tipo = filtro_tipo)
+     group by 1
+     order by 1;
+$$;
+
+-- ---------------------------------------------------------------------
+-- Login: busca pelo username (Usuario.authenticate em models_supabase.py)
+-- ---------------------------------------------------------------------
+create index if not exists idx_usuarios_username on usuarios (username);
+
+-- ---------------------------------------------------------------------
+-- vendas_por_produto: quantidade, valor e número de vendas por produto
+-- Usada por ItemVenda.get_sales_by_product (models_supabase.py), que
+-- alimenta a coluna de vendas realizadas da página de estoque.
+-- ---------------------------------------------------------------------
+create index if not exists idx_itens_venda_venda_id on itens_venda (venda_id);
+
+create or replace function vendas_por_produto(
+    filtro_status text default 'concluida',
+    inicio timestamptz default null,
+    fim timestamptz default null
+)
+returns table (produto_id uuid, quantidade bigint, total numeric, vendas bigint)
+language sql
+stable
+as $$
+    select i.produto_id,
+           sum(i.quantidade)::bigint,
+           coalesce(sum(coalesce(i.subtotal, i.quantidade * i.preco_unitario)), 0),
+           count(distinct i.venda_id)
+      from itens_venda i
+      join vendas v on v.id = i.venda_id
+     where i.produto_id is not null
+       and (filtro_status is null or v.status = filtro_status)
+       and (inicio is null or v.data_venda >= inicio)
+       and (fim is null or v.data_venda < fim)
+     group by i.produto_id;
+$$;
+
+-- ---------------------------------------------------------------------
+-- Listagens paginadas: ordenação padrão de cada página (BaseModel.paginate)
+-- Com o índice, "order by ... limit ... offset" não ordena a tabela inteira.
+-- ---------------------------------------------------------------------
+create index if not exists idx_clientes_nome on clientes (nome);
+create index if not exists idx_categorias_nome on categorias (nome);
+create index if not exists idx_produtos_nome on produtos (nome);
+create index if not exists idx_produtos_categoria_id on produtos (categoria_id);
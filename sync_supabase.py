@@ -7,8 +7,7 @@ Sistema de Sincronização Bidirecional entre Flask e Supabase
 import time
 import threading
 from datetime import datetime, timedelta
-from supabase_client import supabase
-from models_supabase import Cliente, Categoria, Produto, Estoque, Venda, ItemVenda
+from models_supabase import Cliente, Categoria, Produto, Estoque, Venda
 import logging
 
 logger = logging.getLogger(__name__)
@@ -73,138 +72,59 @@ class SupabaseSync:
         except Exception as e:
             logger.error(f"❌ Erro na sincronização: {e}")
     
+    def _sync_table(self, tabela, model, descricao):
+        """Atualiza caches e índices locais com os registros alterados de uma tabela.
+        
+        Os registros já estão gravados no banco (inclusive os alterados por outros
+        processos); aqui apenas invalidamos o cache de leitura e atualizamos a tabela
+        em memória e os observadores de escrita, sem gravar nada de volta.
+        """
+        inicio = datetime.now()
+        last_sync_str = self.last_sync[tabela].isoformat()
+        
+        # Buscar alterações paginadas desde a última sincronização (erro propaga e mantém last_sync)
+        alterados = list(model.iter_all(active_only=False, updated_at__gte=last_sync_str))
+        
+        if alterados:
+            logger.info(f"🔄 Sincronizando {len(alterados)} {descricao}...")
+            model.refresh_local(alterados)
+            logger.debug(f"✅ {len(alterados)} {descricao} sincronizados")
+        
+        # Próxima leitura a partir do início desta, para não perder alterações feitas durante ela
+        self.last_sync[tabela] = inicio
+    
     def sync_clientes(self):
         """Sincroniza tabela de clientes"""
         try:
-            # Buscar clientes do Supabase com timestamp mais recente
-            last_sync_str = self.last_sync['clientes'].isoformat()
-            
-            response = supabase.client.table('clientes').select('*').gte('updated_at', last_sync_str).execute()
-            
-            if response.data:
-                logger.info(f"🔄 Sincronizando {len(response.data)} clientes...")
-                
-                for cliente_data in response.data:
-                    # Verificar se o cliente já existe no sistema
-                    existing = Cliente.get_by_id(cliente_data['id'])
-                    
-                    if existing:
-                        # Atualizar se foi modificado no Supabase
-                        if existing.get('updated_at') != cliente_data.get('updated_at'):
-                            Cliente.update(cliente_data['id'], **cliente_data)
-                            logger.debug(f"✅ Cliente {cliente_data['nome']} atualizado via sincronização")
-                    else:
-                        # Criar novo cliente
-                        Cliente.create(**cliente_data)
-                        logger.debug(f"✅ Cliente {cliente_data['nome']} criado via sincronização")
-                
-                # Atualizar timestamp de última sincronização
-                self.last_sync['clientes'] = datetime.now()
-                
+            self._sync_table('clientes', Cliente, 'clientes')
         except Exception as e:
             logger.error(f"❌ Erro ao sincronizar clientes: {e}")
     
     def sync_categorias(self):
         """Sincroniza tabela de categorias"""
         try:
-            last_sync_str = self.last_sync['categorias'].isoformat()
-            
-            response = supabase.client.table('categorias').select('*').gte('updated_at', last_sync_str).execute()
-            
-            if response.data:
-                logger.info(f"🔄 Sincronizando {len(response.data)} categorias...")
-                
-                for categoria_data in response.data:
-                    existing = Categoria.get_by_id(categoria_data['id'])
-                    
-                    if existing:
-                        if existing.get('updated_at') != categoria_data.get('updated_at'):
-                            Categoria.update(categoria_data['id'], **categoria_data)
-                            logger.debug(f"✅ Categoria {categoria_data['nome']} atualizada via sincronização")
-                    else:
-                        Categoria.create(**categoria_data)
-                        logger.debug(f"✅ Categoria {categoria_data['nome']} criada via sincronização")
-                
-                self.last_sync['categorias'] = datetime.now()
-                
+            self._sync_table('categorias', Categoria, 'categorias')
         except Exception as e:
             logger.error(f"❌ Erro ao sincronizar categorias: {e}")
     
     def sync_produtos(self):
         """Sincroniza tabela de produtos"""
         try:
-            last_sync_str = self.last_sync['produtos'].isoformat()
-            
-            response = supabase.client.table('produtos').select('*').gte('updated_at', last_sync_str).execute()
-            
-            if response.data:
-                logger.info(f"🔄 Sincronizando {len(response.data)} produtos...")
-                
-                for produto_data in response.data:
-                    existing = Produto.get_by_id(produto_data['id'])
-                    
-                    if existing:
-                        if existing.get('updated_at') != produto_data.get('updated_at'):
-                            Produto.update(produto_data['id'], **produto_data)
-                            logger.debug(f"✅ Produto {produto_data['nome']} atualizado via sincronização")
-                    else:
-                        Produto.create(**produto_data)
-                        logger.debug(f"✅ Produto {produto_data['nome']} criado via sincronização")
-                
-                self.last_sync['produtos'] = datetime.now()
-                
+            self._sync_table('produtos', Produto, 'produtos')
         except Exception as e:
             logger.error(f"❌ Erro ao sincronizar produtos: {e}")
     
     def sync_estoque(self):
         """Sincroniza tabela de estoque"""
         try:
-            last_sync_str = self.last_sync['estoque'].isoformat()
-            
-            response = supabase.client.table('estoque').select('*').gte('updated_at', last_sync_str).execute()
-            
-            if response.data:
-                logger.info(f"🔄 Sincronizando {len(response.data)} itens de estoque...")
-                
-                for estoque_data in response.data:
-                    existing = Estoque.get_by_id(estoque_data['id'])
-                    
-                    if existing:
-                        if existing.get('updated_at') != estoque_data.get('updated_at'):
-                            Estoque.update(estoque_data['id'], **estoque_data)
-                            logger.debug(f"✅ Estoque do produto {estoque_data['produto_id']} atualizado via sincronização")
-                    else:
-                        Estoque.create(**estoque_data)
-                        logger.debug(f"✅ Estoque do produto {estoque_data['produto_id']} criado via sincronização")
-                
-                self.last_sync['estoque'] = datetime.now()
-                
+            self._sync_table('estoque', Estoque, 'itens de estoque')
         except Exception as e:
             logger.error(f"❌ Erro ao sincronizar estoque: {e}")
     
     def sync_vendas(self):
         """Sincroniza tabela de vendas"""
         try:
-            last_sync_str = self.last_sync['vendas'].isoformat()
-            
-            response = supabase.client.table('vendas').select('*').gte('updated_at', last_sync_str).execute()
-            
-            if response.data:
-                logger.info(f"🔄 Sincronizando {len(response.data)} vendas...")
-                
-                for venda_data in response.data:
-                    existing = Venda.get_by_id(venda_data['id'])
-                    
-                    if existing:
-                        if existing.get('updated_at') != venda_data.get('updated_at'):
-                            Venda.update(venda_data['id'], **venda_data)
-                            logger.debug(f"✅ Venda {venda_data['id']} atualizada via sincronização")
-                    else:
-                        Venda.create(**venda_data)
-                        logger.debug(f"✅ Venda {venda_data['id']} criada via sincronização")
-                
-                self.last_sync['vendas'] = datetime.now()
-                
+            self._sync_table('vendas', Venda, 'vendas')
         except Exception as e:
             logger.error(f"❌ Erro ao sincronizar vendas: {e}")
     
@@ -0,0 +1,36 @@
+"""Fixtures dos testes: banco SQLite temporário como backend ativo dos modelos"""
+
+import pytest
+
+import db_backends
+from cache_supabase import read_cache, session_cache
+from models_supabase import Categoria, Produto, Estoque, _indexed_tables
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """Backend SQLite novo para cada teste, sem caches de testes anteriores"""
+    monkeypatch.setattr(db_backends, '_backend', db_backends.SQLiteBackend(str(tmp_path / 'teste.db')))
+    read_cache.clear()
+    session_cache.clear()
+    _indexed_tables.clear()
+    yield db_backends.get_backend()
+    read_cache.clear()
+    _indexed_tables.clear()
+
+@pytest.fixture
+def sem_funcao(backend, monkeypatch):
+    """Remove uma função do banco, para exercitar o caminho sem RPC"""
+    def remover(nome):
+        monkeypatch.delitem(backend._functions, nome)
+    return remover
+
+@pytest.fixture
+def produto(backend):
+    """Cria um produto com estoque: produto(quantidade=10, preco=5.0)"""
+    categoria = Categoria.create(nome='Geral')
+    
+    def criar(quantidade=10, preco=5.0):
+        row = Produto.create(nome=f'Produto {quantidade}', preco=preco, categoria_id=categoria['id'])
+        Estoque.create(produto_id=row['id'], quantidade=quantidade, quantidade_minima=1)
+        return row
+    return criar
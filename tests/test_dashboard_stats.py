@@ -0,0 +1,91 @@
+"""Contadores do dashboard mantidos pelas escritas e recontados no banco"""
+
+import time
+
+import pytest
+
+import dashboard_stats as modulo
+from dashboard_stats import DashboardStats
+from db_backends import get_backend
+from models_supabase import Cliente, Produto, Estoque, Venda, _write_listeners, add_write_listener
+
+@pytest.fixture
+def stats(backend):
+    stats = DashboardStats(reconcile_interval=0)
+    add_write_listener(stats.on_write)
+    yield stats
+    _write_listeners.remove(stats.on_write)
+
+def contagem_real():
+    """Os mesmos contadores calculados direto no banco"""
+    backend = get_backend()
+    vendas = backend.select('vendas', ['total', 'status'])
+    return {
+        'clientes': backend.count('clientes'),
+        'produtos': backend.count('produtos'),
+        'categorias': backend.count('categorias'),
+        'vendas': len(vendas),
+        'valor_vendas': round(sum(v['total'] for v in vendas if v['status'] == 'concluida'), 2),
+        'estoque_total': sum(row['quantidade'] for row in backend.select('estoque', ['quantidade']))
+    }
+
+def vender(produto_id, quantidade=1):
+    return Venda.commit_sale({'status': 'concluida', 'tipo': 'venda_normal'},
+                             [{'produto_id': produto_id, 'quantidade': quantidade, 'preco_unitario': 2.5}])
+
+def test_primeira_contagem_em_segundo_plano(stats, produto):
+    produto(quantidade=4)
+    
+    assert stats.snapshot() is None
+    limite = time.monotonic() + 5
+    while stats.get_stats()['idade'] is None and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert stats.snapshot() == contagem_real()
+
+def test_insercoes_somadas_sem_recontar(stats, produto):
+    p = produto(quantidade=10)
+    assert stats.reconcile()
+    
+    Cliente.create(nome='Ana')
+    vender(p['id'], 2)
+    
+    assert stats.get_stats()['desatualizadas'] == ['estoque']
+    assert stats.get_stats()['totais']['clientes'] == 1
+    assert stats.get_stats()['totais']['vendas'] == 1
+    assert stats.snapshot() == contagem_real()
+
+def test_atualizacoes_e_remocoes_recontadas_na_leitura(stats, produto):
+    a, b = produto(quantidade=10), produto(quantidade=3)
+    assert stats.reconcile()
+    
+    Estoque.decrement(a['id'], 4)
+    Produto.delete(b['id'], soft_delete=False)
+    venda = vender(a['id'])['venda']
+    Venda.update(venda['id'], status='cancelada')
+    
+    assert stats.snapshot() == contagem_real()
+    assert stats.get_stats()['desatualizadas'] == []
+
+def test_escritas_durante_a_recontagem(stats, produto, monkeypatch):
+    p = produto(quantidade=20)
+    Cliente.create(nome='Ana')
+    assert stats.reconcile()
+    consultar = modulo.fetch_parallel
+    
+    def consultar_com_escritas(consultas, **kwargs):
+        # Escritas antes e depois das consultas da recontagem em andamento
+        Cliente.create(nome='Antes')
+        vender(p['id'], 3)
+        valores = consultar(consultas, **kwargs)
+        Cliente.create(nome='Depois')
+        vender(p['id'], 2)
+        Estoque.decrement(p['id'], 1)
+        return valores
+    
+    monkeypatch.setattr(modulo, 'fetch_parallel', consultar_com_escritas)
+    assert stats.reconcile()
+    monkeypatch.setattr(modulo, 'fetch_parallel', consultar)
+    
+    assert stats.snapshot() == contagem_real()
+    assert stats.snapshot()['clientes'] == 3
+    assert stats.snapshot()['estoque_total'] == 14
@@ -0,0 +1,91 @@
+"""Baixa de estoque e registro de vendas sem vender além do estoque"""
+
+import threading
+
+import pytest
+
+from db_backends import get_backend
+from models_supabase import Estoque, Venda, ItemVenda
+
+def quantidade(produto_id):
+    """Quantidade em estoque lida direto do banco (sem cache)"""
+    return get_backend().select('estoque', ['quantidade'], [('produto_id', 'eq', produto_id)])[0]['quantidade']
+
+def baixar_em_paralelo(produto_id, vezes):
+    """Executa `vezes` baixas de 1 unidade ao mesmo tempo e retorna quantas deram certo"""
+    inicio = threading.Barrier(vezes)
+    resultados = []
+    
+    def baixar():
+        inicio.wait()
+        resultados.append(Estoque.decrement(produto_id, 1))
+    
+    threads = [threading.Thread(target=baixar) for _ in range(vezes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(1 for resultado in resultados if resultado)
+
+@pytest.mark.parametrize('com_rpc', [True, False], ids=['baixar_estoque', 'condicional'])
+def test_baixa_acima_do_estoque_e_recusada(produto, sem_funcao, com_rpc):
+    if not com_rpc:
+        sem_funcao('baixar_estoque')
+    p = produto(quantidade=5)
+    
+    assert Estoque.decrement(p['id'], 6) is None
+    assert quantidade(p['id']) == 5
+    assert Estoque.decrement(p['id'], 5)['quantidade'] == 0
+    assert Estoque.decrement(p['id'], 1) is None
+    assert quantidade(p['id']) == 0
+
+@pytest.mark.parametrize('com_rpc', [True, False], ids=['baixar_estoque', 'condicional'])
+def test_baixas_concorrentes_nao_vendem_alem_do_estoque(produto, sem_funcao, com_rpc):
+    if not com_rpc:
+        sem_funcao('baixar_estoque')
+    p = produto(quantidade=5)
+    
+    assert baixar_em_paralelo(p['id'], 12) == 5
+    assert quantidade(p['id']) == 0
+
+@pytest.mark.parametrize('com_rpc', [True, False], ids=['registrar_venda', 'etapas'])
+def test_venda_com_estoque_insuficiente_nao_grava_nada(produto, sem_funcao, com_rpc):
+    if not com_rpc:
+        sem_funcao('registrar_venda')
+    a, b = produto(quantidade=5), produto(quantidade=1)
+    
+    resultado = Venda.commit_sale({'status': 'concluida', 'tipo': 'venda_normal'}, [
+        {'produto_id': a['id'], 'quantidade': 2, 'preco_unitario': 5.0},
+        {'produto_id': b['id'], 'quantidade': 2, 'preco_unitario': 5.0}
+    ])
+    
+    assert resultado['ok'] is False
+    assert resultado['insuficientes'] == [{'produto_id': b['id'], 'solicitado': 2, 'disponivel': 1}]
+    assert (quantidade(a['id']), quantidade(b['id'])) == (5, 1)
+    assert Venda.count() == 0 and ItemVenda.count() == 0
+
+def test_venda_em_etapas_desfeita_quando_os_itens_falham(produto, sem_funcao, monkeypatch):
+    sem_funcao('registrar_venda')
+    a, b = produto(quantidade=5), produto(quantidade=3)
+    monkeypatch.setattr(ItemVenda, 'bulk_create',
+                        classmethod(lambda cls, rows, **kwargs: ([], [{'lote': 0, 'linhas': len(rows), 'erro': 'falha'}])))
+    
+    resultado = Venda.commit_sale({'status': 'concluida', 'tipo': 'venda_normal'}, [
+        {'produto_id': a['id'], 'quantidade': 2, 'preco_unitario': 5.0},
+        {'produto_id': b['id'], 'quantidade': 3, 'preco_unitario': 5.0}
+    ])
+    
+    assert resultado is None
+    assert (quantidade(a['id']), quantidade(b['id'])) == (5, 3)
+    assert get_backend().count('vendas') == 0
+
+def test_venda_registrada_baixa_o_estoque(produto):
+    p = produto(quantidade=5)
+    
+    resultado = Venda.commit_sale({'status': 'concluida', 'tipo': 'venda_rapida'},
+                                  [{'produto_id': p['id'], 'quantidade': 2, 'preco_unitario': 5.0}])
+    
+    assert resultado['ok'] is True
+    assert resultado['venda']['total'] == 10.0
+    assert [item['venda_id'] for item in resultado['itens']] == [resultado['venda']['id']]
+    assert quantidade(p['id']) == 3
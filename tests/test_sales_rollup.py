@@ -0,0 +1,82 @@
+"""Agregados diários de vendas mantidos pelas escritas e recontados no banco"""
+
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+import sales_rollup as modulo
+from sales_rollup import SalesRollup
+from models_supabase import Venda, ItemVenda, Produto, _write_listeners, add_write_listener
+
+HOJE = datetime.now(timezone.utc).date()
+INICIO, FIM = HOJE - timedelta(days=10), HOJE
+
+@pytest.fixture
+def rollup(backend):
+    rollup = SalesRollup(reconcile_interval=0)
+    add_write_listener(rollup.on_write)
+    yield rollup
+    _write_listeners.remove(rollup.on_write)
+
+def vender(produto_id, quantidade=1, dias_atras=0, preco=2.5):
+    data = datetime.now(timezone.utc) - timedelta(days=dias_atras)
+    return Venda.commit_sale({'status': 'concluida', 'tipo': 'venda_normal', 'data_venda': data.isoformat()},
+                             [{'produto_id': produto_id, 'quantidade': quantidade, 'preco_unitario': preco}])
+
+def relatorios(rollup):
+    assert rollup.is_ready()
+    return (rollup.por_dia(INICIO, FIM), rollup.por_produto(INICIO, FIM),
+            rollup.por_cliente(INICIO, FIM), rollup.por_categoria(INICIO, FIM))
+
+def recontado():
+    """Relatórios de um rollup novo, contado do zero depois das escritas"""
+    novo = SalesRollup(reconcile_interval=0)
+    assert novo.reconcile()
+    return relatorios(novo)
+
+def test_primeira_contagem_nao_bloqueia(rollup, produto):
+    vender(produto(quantidade=5)['id'])
+    
+    assert rollup.is_ready() is False
+    limite = time.monotonic() + 5
+    while rollup.get_stats()['idade'] is None and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert rollup.is_ready()
+    assert rollup.por_dia(HOJE, HOJE) == [{'dia': HOJE, 'valor': 2.5, 'vendas': 1}]
+
+def test_escritas_recontam_so_os_dias_afetados(rollup, produto):
+    a, b = produto(quantidade=50), produto(quantidade=50)
+    vender(a['id'], 2, dias_atras=3)
+    venda = vender(b['id'], 1, dias_atras=1)['venda']
+    assert rollup.reconcile()
+    
+    vender(a['id'], 4)
+    Venda.update(venda['id'], status='cancelada')
+    item = ItemVenda.find(venda_id=vender(b['id'], 1, dias_atras=3)['venda']['id'])[0]
+    ItemVenda.update(item['id'], quantidade=3, subtotal=7.5)
+    Produto.update(b['id'], categoria_id=None)
+    
+    assert rollup.get_stats()['dias_pendentes'] == 3
+    assert relatorios(rollup) == recontado()
+    assert rollup.get_stats()['dias_pendentes'] == 0
+
+def test_escritas_durante_a_recontagem(rollup, produto, monkeypatch):
+    a, b = produto(quantidade=50), produto(quantidade=50)
+    for dias_atras in range(4):
+        vender(a['id'], 1, dias_atras=dias_atras)
+    assert rollup.reconcile()
+    contar = modulo._Agregados.contar
+    
+    def contar_com_escritas(agregados, vendas):
+        # Escritas depois de contar o bloco, antes de a contagem terminar
+        contar(agregados, vendas)
+        vender(b['id'], 2, dias_atras=2)
+        vender(a['id'], 1)
+    
+    monkeypatch.setattr(modulo._Agregados, 'contar', contar_com_escritas)
+    assert rollup.reconcile()
+    monkeypatch.setattr(modulo._Agregados, 'contar', contar)
+    
+    assert relatorios(rollup) == recontado()
+    assert sum(dia['vendas'] for dia in rollup.por_dia(INICIO, FIM)) == Venda.count()